@@ -1,35 +1,76 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 from flask_socketio import SocketIO, emit
 import cv2
 import numpy as np
 import base64
+import json
 from datetime import datetime
 import easyocr
 import pandas as pd
 import random
-import re
 import os
 
+from database.database import DatabaseManager
+from models.fraud_rules import FraudRuleEngine
+from models.lane_view import LaneView, load_lane_views
+from models.motion_gate import MotionGate
+from models.ocr_cache import OCRCache
+from models.plate_formats import PlateFormatEngine
+from models.plate_localizer import PlateLocalizer
+from models.plate_ocr import BatchOCR
+from models.sighting_window import SightingWindow
+from models.toll_ledger import TollLedger
+from models.vehicle_tracker import VehicleTracker
+from models.vehicle_registry import VehicleRegistry
+
 app = Flask(__name__)
 CORS(app)
 socketio = SocketIO(app, cors_allowed_origins="*")
 
+DEFAULT_LANES = ('http', 'default')
+
 print("Loading EasyOCR...")
 reader = easyocr.Reader(['en'], gpu=False)
 print("EasyOCR loaded successfully!")
 
 class SmartTagSystem:
-    def __init__(self):
+    def __init__(self, db=None, lane_views=None):
         self.vehicle_classes = ['car', 'motorcycle', 'bus', 'truck']
         self.fraud_types = {
             'CLASS_MISMATCH': 'Vehicle Class Mismatch',
             'UNREGISTERED': 'Unregistered Vehicle',
-            'INVALID_PLATE': 'Invalid License Plate'
+            'INVALID_PLATE': 'Invalid License Plate',
+            'DUPLICATE': 'Duplicate Entry'
         }
-        self.registered_vehicles = self.create_sample_database()
-        print(f"System initialized with {len(self.registered_vehicles)} registered vehicles")
-        
+        self.db = db
+        self.lane_views = lane_views or {}
+        self.default_view = LaneView(max_vehicles=3)
+        self.registry = self.load_registry()
+        self.sightings = SightingWindow(window_seconds=30.0)
+        self.plate_formats = PlateFormatEngine()
+        self.rules = FraudRuleEngine()
+        self.localizer = PlateLocalizer()
+        self.ocr = BatchOCR(reader, cache=OCRCache())
+        self.trackers = {}
+        self.gates = {}
+        self.ledger = TollLedger(self.registry, db)
+        if db is not None:
+            self.ledger.start()
+        print(f"System initialized with {len(self.registry)} registered vehicles")
+        
+    def load_registry(self):
+        if self.db is None:
+            return VehicleRegistry.from_dataframe(self.create_sample_database())
+        
+        registry = VehicleRegistry.from_database(self.db)
+        if len(registry) == 0:
+            self.db.save_vehicles(self.create_sample_database().to_dict('records'))
+            registry.refresh_from_database(self.db, full=True)
+        
+        registry.start_auto_refresh(self.db)
+        return registry
+    
     def create_sample_database(self):
         vehicles = []
         states = ['DL', 'MH', 'KA', 'TN', 'GJ', 'UP', 'WB', 'HR', 'RJ', 'MP']
@@ -43,7 +84,7 @@ class SmartTagSystem:
             
             vehicles.append({
                 'plate_number': plate,
-                'owner': f"Owner_{i}",
+                'owner_name': f"Owner_{i}",
                 'vehicle_class': random.choice(self.vehicle_classes),
                 'balance': random.randint(100, 10000),
                 'blacklisted': random.random() < 0.05
@@ -51,17 +92,19 @@ class SmartTagSystem:
         
         return pd.DataFrame(vehicles)
     
-    def detect_vehicles_simple(self, frame):
-        vehicles = []
+    def detect_vehicles_simple(self, frame, mask=None, scale=1.0):
+        candidates = []
         
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
         blurred = cv2.GaussianBlur(gray, (5, 5), 0)
         edges = cv2.Canny(blurred, 50, 150)
+        if mask is not None:
+            edges = cv2.bitwise_and(edges, mask)
         
         contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         
         for contour in contours:
-            area = cv2.contourArea(contour)
+            area = cv2.contourArea(contour) / (scale * scale)
             if area > 5000:
                 x, y, w, h = cv2.boundingRect(contour)
                 aspect_ratio = w / h
@@ -74,53 +117,124 @@ class SmartTagSystem:
                     else:
                         vehicle_class = 'motorcycle'
                     
-                    vehicles.append({
+                    candidates.append((area, {
                         'bbox': [x, y, x+w, y+h],
                         'class': vehicle_class,
                         'confidence': random.uniform(0.75, 0.98),
                         'center': [x + w//2, y + h//2]
-                    })
+                    }))
         
-        return vehicles[:3]
+        candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+        return [vehicle for _, vehicle in candidates]
     
-    def read_plate_easyocr(self, frame, bbox):
+    def plate_region(self, frame, bbox):
         x1, y1, x2, y2 = bbox
         
         vehicle_roi = frame[y1:y2, x1:x2]
         if vehicle_roi.size == 0:
             return None
         
-        h, w = vehicle_roi.shape[:2]
-        plate_region = vehicle_roi[h//2:h, :]
+        candidates = self.localizer.locate(frame, bbox)
+        if candidates:
+            x, y, w, h = candidates[0]
+            plate_region = frame[y:y+h, x:x+w]
+            plate_bbox = [x, y, w, h]
+        else:
+            h, w = vehicle_roi.shape[:2]
+            plate_region = vehicle_roi[h//2:h, :]
+            plate_bbox = [x1, y1 + h//2, w, h//2]
         
         if plate_region.size == 0:
             return None
         
+        gray = cv2.cvtColor(plate_region, cv2.COLOR_BGR2GRAY)
+        _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        
+        return thresh, plate_bbox
+    
+    def read_plates(self, frame, vehicles):
+        regions = [self.plate_region(frame, vehicle['bbox']) for vehicle in vehicles]
+        
         try:
-            gray = cv2.cvtColor(plate_region, cv2.COLOR_BGR2GRAY)
-            _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-            
-            results = reader.readtext(thresh)
-            
-            if results:
-                best_result = max(results, key=lambda x: x[2])
-                text = best_result[1]
-                confidence = best_result[2]
-                
-                text = re.sub(r'[^A-Za-z0-9]', '', text).upper()
-                
-                if len(text) >= 4:
-                    return {
-                        'text': text,
-                        'confidence': confidence,
-                        'bbox': [x1, y1 + h//2, w, h//2]
-                    }
+            results = iter(self.ocr.read_best([region[0] for region in regions if region is not None]))
         except Exception as e:
             print(f"OCR Error: {e}")
+            return [None] * len(vehicles)
+        
+        plates = []
+        for region in regions:
+            best_result = next(results) if region is not None else None
+            plates.append(self.plate_from_ocr(best_result, region[1]) if best_result else None)
+        
+        return plates
+    
+    def plate_from_ocr(self, best_result, bbox):
+        text, confidence = best_result
+        
+        text, plate_format = self.plate_formats.validate(text)
+        
+        if len(text) >= 4:
+            return {
+                'text': text,
+                'confidence': confidence,
+                'bbox': bbox,
+                'is_valid': plate_format is not None,
+                'plate_format': plate_format
+            }
         
         return None
     
-    def check_fraud(self, vehicles, plates):
+    def read_plate_easyocr(self, frame, bbox):
+        return self.read_plates(frame, [{'bbox': bbox}])[0]
+    
+    def view_for(self, lane_id):
+        return self.lane_views.get(lane_id, self.default_view)
+    
+    def check_lane(self, lane_id):
+        if lane_id not in self.lane_views and lane_id not in DEFAULT_LANES:
+            raise ValueError(f"Unknown lane: {lane_id}")
+    
+    def tracker_for(self, lane_id):
+        tracker = self.trackers.get(lane_id)
+        if tracker is None:
+            self.check_lane(lane_id)
+            tracker = self.trackers.setdefault(lane_id, VehicleTracker())
+        return tracker
+    
+    def analyze_frame(self, frame, lane_id=None):
+        vehicles = self.view_for(lane_id).detect(frame, self.detect_vehicles_simple)
+        tracker = self.tracker_for(lane_id)
+        tracks = tracker.update(vehicles)
+        
+        pending = [i for i, track in enumerate(tracks) if tracker.needs_ocr(track)]
+        for i, plate in zip(pending, self.read_plates(frame, [vehicles[i] for i in pending])):
+            tracks[i].observe_plate(plate)
+        plates = [track.plate_for(vehicle) for track, vehicle in zip(tracks, vehicles)]
+        
+        settled = [i for i, track in enumerate(tracks) if tracker.needs_verdict(track)]
+        judged = self.check_fraud([vehicles[i] for i in settled], [plates[i] for i in settled], lane_id)
+        for i, fraud_info in zip(settled, judged):
+            fraud_info['track_id'] = tracks[i].track_id
+            tracks[i].fraud_info = fraud_info
+        
+        departed = tracker.pop_departed()
+        if departed:
+            verdicts = self.check_fraud(
+                [track.vehicle for track in departed], [track.plate_for(track.vehicle) for track in departed], lane_id
+            )
+            for track, fraud_info in zip(departed, verdicts):
+                fraud_info['track_id'] = track.track_id
+            self.record_results(verdicts)
+        
+        judged = dict(zip(settled, judged))
+        fraud_results = [
+            judged[i] if i in judged else track.result_for(vehicle)
+            for i, (track, vehicle) in enumerate(zip(tracks, vehicles))
+        ]
+        
+        return vehicles, plates, fraud_results
+    
+    def check_fraud(self, vehicles, plates, lane_id=None):
         fraud_results = []
         
         for i, vehicle in enumerate(vehicles):
@@ -131,34 +245,52 @@ class SmartTagSystem:
                 'is_fraud': False,
                 'fraud_type': None,
                 'confidence': 0,
-                'timestamp': datetime.now().isoformat()
+                'timestamp': datetime.now().isoformat(),
+                'is_repeat': False,
+                'fraud_flags': [],
+                'plate_number': None
             }
             
             if i < len(plates) and plates[i]:
                 plate_text = plates[i]['text']
-                registered = plate_text in self.registered_vehicles['plate_number'].values
+                fraud_info['plate_number'] = plate_text
+                record = self.registry.lookup(plate_text)
+                
+                sighting = None
+                if lane_id is not None:
+                    sighting = self.sightings.observe(plate_text, lane_id)
+                    fraud_info['is_repeat'] = sighting == SightingWindow.REPEAT
+                
+                fired = self.rules.evaluate_record(
+                    plate_found=True,
+                    has_text=bool(plate_text),
+                    plate_valid=plates[i].get('is_valid', True),
+                    registered=record is not None,
+                    blacklisted=record is not None and bool(record.blacklisted),
+                    balance=self.ledger.balance(plate_text) if record is not None else np.nan,
+                    toll=self.ledger.toll_for(record.vehicle_class) if record is not None else np.nan,
+                    registered_class=record.vehicle_class if record is not None else None,
+                    detected_class=vehicle['class'],
+                    duplicate=sighting == SightingWindow.DUPLICATE,
+                    match_score=1.0
+                )
+                fraud_info['fraud_flags'] = [rule.name for rule in fired]
                 
-                if not registered:
+                if fired:
                     fraud_info['is_fraud'] = True
-                    fraud_info['fraud_type'] = self.fraud_types['UNREGISTERED']
-                    fraud_info['confidence'] = 0.95
-                else:
-                    vehicle_data = self.registered_vehicles[
-                        self.registered_vehicles['plate_number'] == plate_text
-                    ]
-                    
-                    if len(vehicle_data) > 0:
-                        vehicle_data = vehicle_data.iloc[0]
-                        
-                        if vehicle_data['vehicle_class'] != vehicle['class']:
-                            fraud_info['is_fraud'] = True
-                            fraud_info['fraud_type'] = self.fraud_types['CLASS_MISMATCH']
-                            fraud_info['confidence'] = 0.9
-                        
-                        if vehicle_data['blacklisted']:
-                            fraud_info['is_fraud'] = True
-                            fraud_info['fraud_type'] = 'Blacklisted Vehicle'
-                            fraud_info['confidence'] = 1.0
+                    fraud_info['fraud_type'] = fired[0].fraud_type
+                    fraud_info['confidence'] = fired[0].confidence
+                
+                if record is not None and sighting == SightingWindow.NEW and not fraud_info['is_fraud']:
+                    fraud_info['toll'] = self.ledger.debit(plate_text, vehicle['class'], {
+                        'timestamp': fraud_info['timestamp'],
+                        'confidence': vehicle['confidence']
+                    })
+                    if not fraud_info['toll']['charged']:
+                        fraud_info['is_fraud'] = True
+                        fraud_info['fraud_type'] = 'Insufficient Balance'
+                        fraud_info['fraud_flags'].append('LOW_BALANCE')
+                        fraud_info['confidence'] = 1.0
             else:
                 if random.random() < 0.3:
                     fraud_info['is_fraud'] = True
@@ -169,6 +301,92 @@ class SmartTagSystem:
         
         return fraud_results
     
+    def verify_vehicle(self, plate_number, vehicle_class):
+        vehicle = self.registry.lookup(plate_number)
+        balance = self.ledger.balance(plate_number) if vehicle is not None else None
+        
+        fired = self.rules.evaluate_record(
+            plate_found=True,
+            has_text=True,
+            plate_valid=True,
+            registered=vehicle is not None,
+            blacklisted=vehicle is not None and bool(vehicle.blacklisted),
+            balance=balance if balance is not None else np.nan,
+            toll=self.ledger.toll_for(vehicle.vehicle_class) if vehicle is not None else np.nan,
+            registered_class=vehicle.vehicle_class if vehicle is not None else None,
+            detected_class=vehicle_class,
+            match_score=1.0
+        )
+        
+        messages = {
+            'UNREGISTERED': "Vehicle not registered in FASTag system",
+            'BLACKLISTED': "Vehicle is blacklisted",
+            'LOW_BALANCE': f"Insufficient balance: ₹{balance}",
+            'CLASS_MISMATCH': f"Class mismatch. Registered as {vehicle.vehicle_class if vehicle is not None else None}"
+        }
+        failures = [rule.name for rule in fired if rule.name in messages]
+        
+        if failures:
+            return {
+                "verified": False,
+                "message": messages[failures[0]],
+                "status": failures[0],
+                "fraud_flags": failures
+            }
+        
+        return {
+            "verified": True,
+            "message": "Vehicle verified successfully",
+            "status": "VERIFIED",
+            "owner": vehicle.owner_name,
+            "balance": balance
+        }
+    
+    def record_results(self, fraud_results):
+        if self.db is None:
+            return
+        
+        for fraud_info in fraud_results:
+            if fraud_info['is_repeat'] or fraud_info.get('toll', {}).get('charged'):
+                continue
+            if fraud_info['plate_number'] is None and fraud_info.get('track_id') is None:
+                continue
+            
+            self.db.save_transaction(fraud_info)
+            if fraud_info['is_fraud']:
+                self.db.log_fraud(fraud_info['plate_number'], fraud_info['fraud_type'], fraud_info['confidence'])
+    
+    def gate_for(self, lane_id):
+        gate = self.gates.get(lane_id)
+        if gate is None:
+            self.check_lane(lane_id)
+            gate = self.gates.setdefault(lane_id, MotionGate())
+        return gate
+    
+    def render_frame(self, frame, lane_id=None):
+        vehicles, plates, fraud_results = self.analyze_frame(frame, lane_id)
+        self.record_results(fraud_results)
+        annotated_frame = self.annotate_frame(frame, vehicles, plates, fraud_results)
+        
+        _, buffer = cv2.imencode('.jpg', annotated_frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
+        annotated_image = base64.b64encode(buffer).decode('utf-8')
+        
+        return {
+            'annotated_image': f"data:image/jpeg;base64,{annotated_image}",
+            'vehicles': vehicles,
+            'plates': [p for p in plates if p],
+            'fraud_results': fraud_results,
+            'stats': {
+                'vehicle_count': len(vehicles),
+                'plate_count': len([p for p in plates if p]),
+                'fraud_count': len([f for f in fraud_results if f['is_fraud']])
+            }
+        }
+    
+    def process_lane_frame(self, frame, lane_id=None):
+        result, processed = self.gate_for(lane_id).process(frame, lambda frame: self.render_frame(frame, lane_id))
+        return dict(result, motion_skipped=not processed, timestamp=datetime.now().isoformat())
+    
     def annotate_frame(self, frame, vehicles, plates, fraud_results):
         annotated = frame.copy()
         
@@ -205,20 +423,35 @@ class SmartTagSystem:
         
         return annotated
 
-system = SmartTagSystem()
+db = DatabaseManager(archive_dir=os.environ.get('SMARTTAG_ARCHIVE_DIR'))
+if db.archive is not None:
+    db.start_retention(int(os.environ.get('SMARTTAG_RETENTION_DAYS', 90)))
+system = SmartTagSystem(db, load_lane_views(os.environ.get('SMARTTAG_LANES', 'lanes.json')))
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
     return jsonify({
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "vehicles_registered": len(system.registered_vehicles)
+        "vehicles_registered": len(system.registry),
+        "ocr": system.ocr.get_stats(),
+        "plate_localizer": system.localizer.get_stats(),
+        "writes": system.db.get_write_stats(),
+        "rules": system.rules.rule_stats(),
+        "tracking": {str(lane_id): tracker.get_stats() for lane_id, tracker in system.trackers.items()},
+        "motion": {str(lane_id): gate.get_stats() for lane_id, gate in system.gates.items()}
     })
 
 @app.route('/api/process_frame', methods=['POST'])
 def process_frame():
     try:
         data = request.json
+        lane_id = data.get('lane_id', 'http')
+        try:
+            system.check_lane(lane_id)
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+        
         image_data = data['image'].split(',')[1]
         image_bytes = base64.b64decode(image_data)
         
@@ -228,37 +461,67 @@ def process_frame():
         if frame is None:
             return jsonify({"success": False, "error": "Invalid image"}), 400
         
-        vehicles = system.detect_vehicles_simple(frame)
+        result = system.process_lane_frame(frame, lane_id)
         
-        plates = []
-        for vehicle in vehicles:
-            plate = system.read_plate_easyocr(frame, vehicle['bbox'])
-            plates.append(plate)
+        return jsonify(dict(result, success=True))
         
-        fraud_results = system.check_fraud(vehicles, plates)
-        annotated_frame = system.annotate_frame(frame, vehicles, plates, fraud_results)
-        
-        _, buffer = cv2.imencode('.jpg', annotated_frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
-        annotated_image = base64.b64encode(buffer).decode('utf-8')
+    except Exception as e:
+        print(f"Error processing frame: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/get_statistics', methods=['GET'])
+def get_statistics():
+    try:
+        statistics = system.db.get_rollup_statistics(request.args.get('start'), request.args.get('end'))
+        return jsonify({"success": True, "statistics": statistics})
         
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+def transaction_filters(args):
+    return {
+        'plate_number': args.get('plate'),
+        'fraud_type': args.get('fraud_type'),
+        'start': args.get('start'),
+        'end': args.get('end')
+    }
+
+@app.route('/api/transactions', methods=['GET'])
+def get_transactions():
+    try:
+        after = None
+        if request.args.get('cursor'):
+            timestamp, transaction_id = request.args['cursor'].rsplit('|', 1)
+            after = (timestamp, int(transaction_id))
+        
+        transactions, next_cursor = system.db.get_transactions_page(
+            limit=max(1, min(int(request.args.get('limit', 100)), 1000)),
+            after=after,
+            **transaction_filters(request.args)
+        )
         return jsonify({
             "success": True,
-            "annotated_image": f"data:image/jpeg;base64,{annotated_image}",
-            "vehicles": vehicles,
-            "plates": [p for p in plates if p],
-            "fraud_results": fraud_results,
-            "stats": {
-                "vehicle_count": len(vehicles),
-                "plate_count": len([p for p in plates if p]),
-                "fraud_count": len([f for f in fraud_results if f['is_fraud']])
-            },
-            "timestamp": datetime.now().isoformat()
+            "transactions": transactions,
+            "next_cursor": f"{next_cursor[0]}|{next_cursor[1]}" if next_cursor else None
         })
         
     except Exception as e:
-        print(f"Error processing frame: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
 
+@app.route('/api/transactions/export', methods=['GET'])
+def export_transactions():
+    filters = transaction_filters(request.args)
+    include_archive = request.args.get('archive') == '1'
+    if include_archive and system.db.archive is None:
+        return jsonify({"success": False, "error": "Archive is not configured (set SMARTTAG_ARCHIVE_DIR)"}), 400
+    
+    rows = system.db.iter_transactions(include_archive=include_archive, **filters)
+    return Response(
+        (json.dumps(row, default=str) + '\n' for row in rows),
+        mimetype='application/x-ndjson',
+        headers={'Content-Disposition': 'attachment; filename=transactions.ndjson'}
+    )
+
 @app.route('/api/verify_vehicle', methods=['POST'])
 def verify_vehicle():
     try:
@@ -266,44 +529,7 @@ def verify_vehicle():
         plate_number = data.get('plate_number', '').upper()
         vehicle_class = data.get('vehicle_class', '')
         
-        vehicle_data = system.registered_vehicles[
-            system.registered_vehicles['plate_number'] == plate_number
-        ]
-        
-        if len(vehicle_data) == 0:
-            return jsonify({
-                "success": True,
-                "verified": False,
-                "message": "Vehicle not registered in FASTag system",
-                "status": "UNREGISTERED"
-            })
-        
-        vehicle = vehicle_data.iloc[0]
-        
-        if vehicle['blacklisted']:
-            return jsonify({
-                "success": True,
-                "verified": False,
-                "message": "Vehicle is blacklisted",
-                "status": "BLACKLISTED"
-            })
-        
-        if vehicle['vehicle_class'] != vehicle_class:
-            return jsonify({
-                "success": True,
-                "verified": False,
-                "message": f"Class mismatch. Registered as {vehicle['vehicle_class']}",
-                "status": "CLASS_MISMATCH"
-            })
-        
-        return jsonify({
-            "success": True,
-            "verified": True,
-            "message": "Vehicle verified successfully",
-            "status": "VERIFIED",
-            "owner": vehicle['owner'],
-            "balance": float(vehicle['balance'])
-        })
+        return jsonify(dict(system.verify_vehicle(plate_number, vehicle_class), success=True))
         
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
@@ -329,30 +555,7 @@ def handle_stream_frame(data):
         if frame is None:
             return
         
-        vehicles = system.detect_vehicles_simple(frame)
-        plates = []
-        for vehicle in vehicles:
-            plate = system.read_plate_easyocr(frame, vehicle['bbox'])
-            plates.append(plate)
-        
-        fraud_results = system.check_fraud(vehicles, plates)
-        annotated_frame = system.annotate_frame(frame, vehicles, plates, fraud_results)
-        
-        _, buffer = cv2.imencode('.jpg', annotated_frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
-        annotated_image = base64.b64encode(buffer).decode('utf-8')
-        
-        emit('processed_frame', {
-            'annotated_image': f"data:image/jpeg;base64,{annotated_image}",
-            'vehicles': vehicles,
-            'plates': [p for p in plates if p],
-            'fraud_results': fraud_results,
-            'stats': {
-                'vehicle_count': len(vehicles),
-                'plate_count': len([p for p in plates if p]),
-                'fraud_count': len([f for f in fraud_results if f['is_fraud']])
-            },
-            'timestamp': datetime.now().isoformat()
-        })
+        emit('processed_frame', system.process_lane_frame(frame, data.get('lane_id', 'default')))
         
     except Exception as e:
         print(f"Error processing stream frame: {e}")
@@ -362,7 +565,7 @@ if __name__ == '__main__':
     print("SmartTag Toll Verification System")
     print("="*50)
     print(f"Python Version: {os.sys.version}")
-    print(f"Registered Vehicles: {len(system.registered_vehicles)}")
+    print(f"Registered Vehicles: {len(system.registry)}")
     print(f"Server starting on http://localhost:5000")
     print("="*50)
     socketio.run(app, debug=True, port=5000, allow_unsafe_werkzeug=True)
\ No newline at end of file
@@ -0,0 +1,132 @@
+import os
+import pandas as pd
+
+# Timestamp prefix that names each partition
+PARTITION_LENGTHS = {
+    'day': 10,      # 2024-05-31
+    'month': 7      # 2024-05
+}
+
+ARCHIVE_TABLES = ('transactions', 'fraud_logs')
+
+class TransactionArchive:
+    """Parquet archive for rows rolled out of the hot SQLite tables
+
+    Rows are partitioned by the day or month of their timestamp into
+    directory/<table>/<partition>/part-<first id>-<last id>.parquet. Part
+    names depend only on the rows they hold, so re-running an interrupted
+    archive pass rewrites the same files instead of duplicating them.
+    """
+
+    def __init__(self, db, directory='archive', partition='day'):
+        self.db = db
+        self.directory = directory
+        self.partition_length = PARTITION_LENGTHS[partition]
+
+    def archive_before(self, cutoff, batch_size=50000):
+        """Move rows older than cutoff into the archive, returning rows moved per table
+
+        Each batch is written to Parquet before it is deleted, and deleted in
+        its own short transaction so lanes keep writing meanwhile.
+        """
+        cutoff = cutoff.isoformat() if hasattr(cutoff, 'isoformat') else cutoff
+        conn = self.db.connect()
+        moved = {}
+
+        for table in ARCHIVE_TABLES:
+            moved[table] = 0
+            while True:
+                cursor = conn.execute(
+                    f'SELECT * FROM {table} WHERE timestamp < ? ORDER BY timestamp, id LIMIT ?',
+                    (cutoff, batch_size)
+                )
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+
+                df = pd.DataFrame.from_records(rows, columns=[column[0] for column in cursor.description])
+                for partition, part in df.groupby(df['timestamp'].str[:self.partition_length]):
+                    self.write_part(table, partition, part)
+
+                with conn:
+                    conn.executemany(f'DELETE FROM {table} WHERE id = ?', [(int(i),) for i in df['id']])
+                moved[table] += len(df)
+
+        return moved
+
+    def write_part(self, table, partition, df):
+        """Write one partition's share of a batch atomically"""
+        directory = os.path.join(self.directory, table, partition)
+        os.makedirs(directory, exist_ok=True)
+
+        path = os.path.join(directory, f"part-{df['id'].min()}-{df['id'].max()}.parquet")
+        df.to_parquet(path + '.tmp', index=False)
+        os.replace(path + '.tmp', path)
+
+    def partitions(self, table, start=None, end=None):
+        """Partition names for table that may hold rows in [start, end), oldest first"""
+        root = os.path.join(self.directory, table)
+        if not os.path.isdir(root):
+            return []
+
+        start = start.isoformat() if hasattr(start, 'isoformat') else start
+        end = end.isoformat() if hasattr(end, 'isoformat') else end
+        return sorted(
+            name for name in os.listdir(root)
+            if (start is None or name >= start[:self.partition_length]) and
+               (end is None or name <= end[:self.partition_length])
+        )
+
+    def read_partition(self, table, partition, columns=None):
+        """Load every part file of one partition"""
+        directory = os.path.join(self.directory, table, partition)
+        frames = [
+            pd.read_parquet(os.path.join(directory, name), columns=columns)
+            for name in sorted(os.listdir(directory)) if name.endswith('.parquet')
+        ]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns)
+
+    def _filter(self, df, start=None, end=None, plate_number=None, fraud_type=None):
+        mask = pd.Series(True, index=df.index)
+        if start is not None:
+            mask &= df['timestamp'] >= (start.isoformat() if hasattr(start, 'isoformat') else start)
+        if end is not None:
+            mask &= df['timestamp'] < (end.isoformat() if hasattr(end, 'isoformat') else end)
+        if plate_number is not None:
+            mask &= df['plate_number'] == plate_number
+        if fraud_type is not None:
+            mask &= df['fraud_type'] == fraud_type
+        return df[mask]
+
+    def read(self, table, start=None, end=None, columns=None, plate_number=None, fraud_type=None):
+        """Load archived rows in [start, end), reading only overlapping partitions and the given columns"""
+        frames = [self.read_partition(table, partition, columns) for partition in self.partitions(table, start, end)]
+        if not frames:
+            return pd.DataFrame(columns=columns)
+        return self._filter(pd.concat(frames, ignore_index=True), start, end, plate_number, fraud_type)
+
+    def transaction_groups(self, start=None, end=None):
+        """(hour, vehicle_class, is_fraud, fraud_type, count) groups of archived transactions"""
+        df = self.read('transactions', start, end, columns=['timestamp', 'vehicle_class', 'is_fraud', 'fraud_type'])
+        if df.empty:
+            return []
+
+        keys = pd.DataFrame({
+            'hour': df['timestamp'].str[11:13],
+            'vehicle_class': df['vehicle_class'],
+            'is_fraud': df['is_fraud'].fillna(0).astype(int) == 1,
+            'fraud_type': df['fraud_type']
+        })
+        counts = keys.groupby(list(keys.columns), dropna=False).size()
+        return [
+            tuple(None if pd.isna(value) else value for value in key) + (int(count),)
+            for key, count in counts.items()
+        ]
+
+    def iter_rows(self, table, start=None, end=None, plate_number=None, fraud_type=None):
+        """Yield archived rows as dicts, newest first, one partition at a time"""
+        for partition in reversed(self.partitions(table, start, end)):
+            df = self._filter(self.read_partition(table, partition), start, end, plate_number, fraud_type)
+            df = df.sort_values(['timestamp', 'id'], ascending=False)
+            for row in df.astype(object).where(df.notna(), None).to_dict('records'):
+                yield row
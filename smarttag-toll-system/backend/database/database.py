@@ -1,189 +1,853 @@
 import sqlite3
-import pandas as pd
-from datetime import datetime
+from datetime import datetime, timedelta
 import json
+import atexit
+import os
+import queue
+import threading
+import time
+
+from database.archive import TransactionArchive
+
+# Applied to every new connection. WAL lets dashboard reads run alongside lane
+# writes; synchronous=NORMAL is durable across application crashes in WAL mode.
+CONNECTION_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'cache_size': -20000,
+    'temp_store': 'MEMORY',
+    'mmap_size': 268435456
+}
+
+# Errors that mean a row itself can never be written; anything else is retried
+BAD_ROW_ERRORS = (sqlite3.IntegrityError, sqlite3.InterfaceError, sqlite3.ProgrammingError,
+                  KeyError, IndexError, TypeError, ValueError)
+
+def is_lock_error(error):
+    """True for the transient errors another writer holding the database causes"""
+    message = str(error).lower()
+    return isinstance(error, sqlite3.OperationalError) and ('locked' in message or 'busy' in message)
+
+# Group-committed INSERTs, keyed by the table tag queued with each row
+WRITE_STATEMENTS = {
+    'transactions': '''
+        INSERT INTO transactions (timestamp, plate_number, vehicle_class, fraud_type, is_fraud, confidence)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''',
+    'fraud_logs': '''
+        INSERT INTO fraud_logs (timestamp, plate_number, fraud_type, confidence, action_taken)
+        VALUES (?, ?, ?, ?, ?)
+    '''
+}
 
 class DatabaseManager:
-    def __init__(self, db_path='smarttag.db'):
+    def __init__(self, db_path='smarttag.db', pragmas=None, write_behind=True,
+                 batch_size=500, flush_interval=0.05, max_queue=10000, max_retries=3,
+                 max_backoff=2.0, archive_dir=None, archive_partition='day'):
         self.db_path = db_path
+        self.pragmas = dict(CONNECTION_PRAGMAS, **(pragmas or {}))
+        
+        # Old transactions and fraud logs are rolled out to Parquet files
+        self.archive = TransactionArchive(self, archive_dir, archive_partition) if archive_dir else None
+        
+        # One persistent connection per thread, opened on first use
+        self.local = threading.local()
+        self.connections = {}
+        self.connections_lock = threading.Lock()
+        
+        # Transactions and fraud logs are queued and committed in groups of up
+        # to batch_size rows or every flush_interval seconds; a full queue
+        # blocks producers rather than dropping rows. Failed flushes are
+        # retried with exponential backoff up to max_backoff seconds.
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.write_queue = queue.Queue(maxsize=max_queue)
+        self.max_retries = max_retries
+        self.max_backoff = max_backoff
+        self.retry_rows = []
+        self.retry_attempts = 0
+        self.write_lock = threading.Lock()
+        self.stats_lock = threading.Lock()
+        self.write_stats = {
+            'rows_written': 0,
+            'flushes': 0,
+            'blocked_puts': 0,
+            'dropped_rows': 0,
+            'failed_flushes': 0,
+            'lock_retries': 0,
+            'last_flush_ms': 0.0,
+            'max_flush_ms': 0.0,
+            'total_flush_ms': 0.0
+        }
+        self.stop_event = None
+        self.writer_thread = None
+        self.retention_stop = None
+        self.retention_thread = None
+        
         self.init_database()
+        
+        if write_behind:
+            self.start_writer()
+            atexit.register(self.close)
+    
+    def connect(self):
+        """Return this thread's persistent connection, opening it on first use"""
+        conn = getattr(self.local, 'conn', None)
+        
+        # Connections must not cross a fork into worker processes
+        if conn is None or self.local.pid != os.getpid():
+            # Only the owning thread uses it; close() may run from another
+            conn = sqlite3.connect(
+                self.db_path,
+                timeout=self.pragmas['busy_timeout'] / 1000,
+                check_same_thread=False
+            )
+            for name, value in self.pragmas.items():
+                conn.execute(f'PRAGMA {name} = {value}')
+            
+            self.local.conn = conn
+            self.local.pid = os.getpid()
+            
+            with self.connections_lock:
+                # Request threads come and go; drop connections whose thread has exited
+                for thread in [thread for thread in self.connections if not thread.is_alive()]:
+                    self.connections.pop(thread).close()
+                self.connections[threading.current_thread()] = conn
+        
+        return conn
+    
+    def close(self):
+        """Flush queued writes and close every connection opened by this manager"""
+        self.stop_retention()
+        self.stop_writer()
+        
+        with self.connections_lock:
+            connections, self.connections = self.connections, {}
+        
+        for conn in connections.values():
+            conn.close()
+        self.local = threading.local()
+    
+    def start_writer(self):
+        """Start the group-commit thread for transactions and fraud logs"""
+        if self.writer_thread is not None:
+            return
+        
+        self.stop_event = threading.Event()
+        stop = self.stop_event
+        
+        def run():
+            # Rows held back by a failed flush keep the thread alive after stop
+            while not stop.is_set() or not self.write_queue.empty() or self.retry_rows:
+                try:
+                    rows = [self.write_queue.get(timeout=self.flush_interval)]
+                except queue.Empty:
+                    rows = []
+                
+                # Gather more rows until the batch is full or the interval is up
+                deadline = time.monotonic() + self.flush_interval
+                while rows and len(rows) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        rows.append(self.write_queue.get(timeout=remaining))
+                    except queue.Empty:
+                        break
+                
+                # An idle queue still retries held-back rows on each timeout
+                if not rows and not self.retry_rows:
+                    continue
+                
+                try:
+                    self.write_rows(rows)
+                except Exception as e:
+                    print(f"Database write-behind error: {e}")
+                    time.sleep(self.retry_delay())
+        
+        self.writer_thread = threading.Thread(target=run, name='db-writer', daemon=True)
+        self.writer_thread.start()
+    
+    def stop_writer(self):
+        """Stop the group-commit thread after it drains the queue and held-back rows"""
+        if self.writer_thread is not None:
+            self.stop_event.set()
+            self.writer_thread.join()
+            self.writer_thread = None
+        self.flush_writes()
+    
+    def enqueue_write(self, table, row):
+        """Queue one row for group commit, or write it now when write-behind is off"""
+        if self.writer_thread is None:
+            self.write_rows([(table, row)])
+            return
+        
+        try:
+            self.write_queue.put_nowait((table, row))
+        except queue.Full:
+            with self.stats_lock:
+                self.write_stats['blocked_puts'] += 1
+            self.write_queue.put((table, row))
+    
+    def write_rows(self, rows):
+        """Insert queued rows with one executemany per table in a single commit
+        
+        A batch that fails because another writer holds the database is kept
+        and retried for as long as the lock lasts. Any other failure is
+        retried up to max_retries times. After that the rows are written one
+        at a time: rows that can never be written (constraint violations, bad
+        values) are logged and dropped, so one bad row cannot block the queue.
+        A lock error on the way keeps the remaining rows for the next retry.
+        """
+        with self.write_lock:
+            # Rows from a failed flush go first so their order is kept
+            rows, self.retry_rows = self.retry_rows + rows, []
+            try:
+                self.commit_rows(rows)
+            except Exception as e:
+                self.retry_attempts += 1
+                with self.stats_lock:
+                    self.write_stats['failed_flushes'] += 1
+                    self.write_stats['lock_retries'] += is_lock_error(e)
+                
+                if is_lock_error(e) or self.retry_attempts <= self.max_retries:
+                    self.retry_rows = rows
+                    raise
+                
+                for i, (table, row) in enumerate(rows):
+                    try:
+                        self.commit_rows([(table, row)])
+                    except BAD_ROW_ERRORS as row_error:
+                        with self.stats_lock:
+                            self.write_stats['dropped_rows'] += 1
+                        print(f"Dropping {table} row that cannot be written: {row!r} ({row_error})")
+                    except Exception:
+                        self.retry_rows = rows[i:]
+                        raise
+            
+            self.retry_attempts = 0
+    
+    def retry_delay(self):
+        """Seconds to wait before retrying a failed flush, doubling per attempt"""
+        return min(self.flush_interval * 2 ** min(self.retry_attempts, 16), self.max_backoff)
+    
+    def commit_rows(self, rows):
+        """Write (table, row) pairs in one transaction; caller holds write_lock"""
+        by_table = {}
+        for table, row in rows:
+            by_table.setdefault(table, []).append(row)
+        
+        started = time.perf_counter()
+        conn = self.connect()
+        with conn:
+            for table, table_rows in by_table.items():
+                conn.executemany(WRITE_STATEMENTS[table], table_rows)
+            if 'transactions' in by_table:
+                self.add_to_rollups(conn.cursor(), [
+                    (row[0], row[2], row[4], row[3]) for row in by_table['transactions']
+                ])
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        
+        with self.stats_lock:
+            stats = self.write_stats
+            stats['rows_written'] += len(rows)
+            stats['flushes'] += 1
+            stats['last_flush_ms'] = elapsed_ms
+            stats['max_flush_ms'] = max(stats['max_flush_ms'], elapsed_ms)
+            stats['total_flush_ms'] += elapsed_ms
+    
+    def flush_writes(self):
+        """Write everything queued so far from the calling thread"""
+        rows = []
+        while True:
+            try:
+                rows.append(self.write_queue.get_nowait())
+            except queue.Empty:
+                break
+        
+        if rows or self.retry_rows:
+            self.write_rows(rows)
+    
+    def get_write_stats(self):
+        """Queue depth and flush latency counters for the write-behind queue"""
+        with self.stats_lock:
+            stats = dict(self.write_stats)
+        stats['queue_depth'] = self.write_queue.qsize() + len(self.retry_rows)
+        stats['max_queue'] = self.write_queue.maxsize
+        stats['avg_flush_ms'] = stats['total_flush_ms'] / stats['flushes'] if stats['flushes'] else 0.0
+        return stats
     
     def init_database(self):
         """Initialize database tables"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        conn = self.connect()
+        with conn:
+            cursor = conn.cursor()
+            
+            # Create transactions table
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS transactions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp DATETIME,
+                    plate_number TEXT,
+                    vehicle_class TEXT,
+                    fraud_type TEXT,
+                    is_fraud BOOLEAN,
+                    confidence REAL,
+                    image_path TEXT,
+                    verified BOOLEAN DEFAULT FALSE,
+                    toll_amount REAL
+                )
+            ''')
+            self.ensure_column(cursor, 'transactions', 'toll_amount', 'REAL')
+            
+            # Create vehicles table
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS vehicles (
+                    plate_number TEXT PRIMARY KEY,
+                    owner_name TEXT,
+                    vehicle_class TEXT,
+                    registration_date DATE,
+                    balance REAL,
+                    toll_pass TEXT,
+                    blacklisted BOOLEAN DEFAULT FALSE,
+                    last_seen DATETIME,
+                    updated_at DATETIME
+                )
+            ''')
+            self.ensure_column(cursor, 'vehicles', 'updated_at', 'DATETIME')
+            
+            # Registry refresh pages through rows changed since an (updated_at, plate_number) watermark
+            cursor.execute('DROP INDEX IF EXISTS idx_vehicles_updated_at')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_vehicles_updated ON vehicles (updated_at, plate_number)')
+            
+            # Statistics filter by time range and group by fraud type and class
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_transactions_timestamp ON transactions (timestamp)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_transactions_fraud ON transactions (is_fraud, fraud_type)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_transactions_vehicle_class ON transactions (vehicle_class)')
+            
+            # History for one plate, newest first, without scanning other plates
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_transactions_plate ON transactions (plate_number, timestamp)')
+            
+            # Create fraud_logs table
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS fraud_logs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp DATETIME,
+                    plate_number TEXT,
+                    fraud_type TEXT,
+                    confidence REAL,
+                    action_taken TEXT,
+                    resolved BOOLEAN DEFAULT FALSE
+                )
+            ''')
+            
+            # Retention walks fraud logs oldest first
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_fraud_logs_timestamp ON fraud_logs (timestamp)')
+            
+            # Hourly counters per class and fraud type, kept current by every
+            # transactions insert, so the dashboard reads a few hundred buckets
+            # instead of scanning the table. NULLs are stored as '' because
+            # they never collide in a primary key.
+            rollups_exist = cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'transaction_rollups'"
+            ).fetchone()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS transaction_rollups (
+                    bucket TEXT,
+                    vehicle_class TEXT,
+                    is_fraud INTEGER,
+                    fraud_type TEXT,
+                    count INTEGER,
+                    PRIMARY KEY (bucket, vehicle_class, is_fraud, fraud_type)
+                ) WITHOUT ROWID
+            ''')
+            
+            if not rollups_exist:
+                self.rebuild_rollups(cursor)
+    
+    def add_to_rollups(self, cursor, transactions):
+        """Fold (timestamp, vehicle_class, is_fraud, fraud_type) rows into the rollups
         
-        # Create transactions table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS transactions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp DATETIME,
-                plate_number TEXT,
-                vehicle_class TEXT,
-                fraud_type TEXT,
-                is_fraud BOOLEAN,
-                confidence REAL,
-                image_path TEXT,
-                verified BOOLEAN DEFAULT FALSE
-            )
-        ''')
-        
-        # Create vehicles table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS vehicles (
-                plate_number TEXT PRIMARY KEY,
-                owner_name TEXT,
-                vehicle_class TEXT,
-                registration_date DATE,
-                balance REAL,
-                toll_pass TEXT,
-                blacklisted BOOLEAN DEFAULT FALSE,
-                last_seen DATETIME
-            )
-        ''')
-        
-        # Create fraud_logs table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS fraud_logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp DATETIME,
-                plate_number TEXT,
-                fraud_type TEXT,
-                confidence REAL,
-                action_taken TEXT,
-                resolved BOOLEAN DEFAULT FALSE
+        Callers pass the rows they are inserting so the counters commit in the
+        same transaction; a batch costs one upsert per distinct bucket.
+        """
+        counts = {}
+        for timestamp, vehicle_class, is_fraud, fraud_type in transactions:
+            key = (
+                str(timestamp)[:13] if timestamp is not None else '',
+                vehicle_class or '',
+                1 if is_fraud else 0,
+                fraud_type or ''
             )
-        ''')
+            counts[key] = counts.get(key, 0) + 1
         
-        conn.commit()
-        conn.close()
+        cursor.executemany('''
+            INSERT INTO transaction_rollups (bucket, vehicle_class, is_fraud, fraud_type, count)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (bucket, vehicle_class, is_fraud, fraud_type)
+            DO UPDATE SET count = count + excluded.count
+        ''', [key + (count,) for key, count in counts.items()])
+    
+    def rebuild_rollups(self, cursor=None):
+        """Recompute transaction_rollups from the transactions table"""
+        conn = self.connect()
+        with conn:
+            cursor = cursor or conn.cursor()
+            cursor.execute('DELETE FROM transaction_rollups')
+            cursor.execute('''
+                INSERT INTO transaction_rollups (bucket, vehicle_class, is_fraud, fraud_type, count)
+                SELECT
+                    COALESCE(substr(timestamp, 1, 13), ''),
+                    COALESCE(vehicle_class, ''),
+                    COALESCE(is_fraud = 1, 0),
+                    COALESCE(fraud_type, ''),
+                    COUNT(*)
+                FROM transactions
+                GROUP BY 1, 2, 3, 4
+            ''')
+    
+    def ensure_column(self, cursor, table, column, column_type):
+        """Add a column to databases created before it existed"""
+        columns = [row[1] for row in cursor.execute(f'PRAGMA table_info({table})')]
+        if column not in columns:
+            cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {column_type}')
     
     def save_transaction(self, fraud_result):
-        """Save transaction to database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO transactions (timestamp, vehicle_class, fraud_type, is_fraud, confidence)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (
+        """Queue a transaction for the next group commit"""
+        self.enqueue_write('transactions', (
             fraud_result['timestamp'],
+            fraud_result.get('plate_number'),
             fraud_result['vehicle_class'],
             fraud_result['fraud_type'],
             fraud_result['is_fraud'],
             fraud_result['confidence']
         ))
-        
-        conn.commit()
-        conn.close()
     
     def save_vehicle(self, vehicle_data):
         """Save vehicle information"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connect()
+        with conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                INSERT OR REPLACE INTO vehicles 
+                (plate_number, owner_name, vehicle_class, registration_date, balance, toll_pass, blacklisted, last_seen, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                vehicle_data['plate_number'],
+                vehicle_data['owner_name'],
+                vehicle_data['vehicle_class'],
+                vehicle_data['registration_date'],
+                vehicle_data['balance'],
+                vehicle_data['toll_pass'],
+                vehicle_data.get('blacklisted', False),
+                datetime.now().isoformat(),
+                datetime.now().isoformat()
+            ))
+    
+    def save_vehicles(self, vehicles):
+        """Save many vehicles in one transaction"""
+        conn = self.connect()
+        with conn:
+            cursor = conn.cursor()
+            now = datetime.now().isoformat()
+            
+            cursor.executemany('''
+                INSERT OR REPLACE INTO vehicles 
+                (plate_number, owner_name, vehicle_class, registration_date, balance, toll_pass, blacklisted, last_seen, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [
+                (
+                    vehicle_data['plate_number'],
+                    vehicle_data.get('owner_name'),
+                    vehicle_data['vehicle_class'],
+                    vehicle_data.get('registration_date'),
+                    vehicle_data.get('balance', 0),
+                    vehicle_data.get('toll_pass'),
+                    vehicle_data.get('blacklisted', False),
+                    now,
+                    now
+                )
+                for vehicle_data in vehicles
+            ])
+    
+    def bulk_load_vehicles(self, chunks, commit_rows=1000000):
+        """Load chunks of vehicle tuples as fast as SQLite allows, returning rows written
+        
+        Each chunk is a list of (plate_number, owner_name, vehicle_class,
+        registration_date, balance, toll_pass, blacklisted) tuples. Secondary
+        indexes are dropped for the load and rebuilt once at the end, and rows
+        are committed every commit_rows instead of per vehicle. Each commit
+        stamps its rows' updated_at afresh, so a registry refresh polling
+        during the load still sees every later commit as new.
+        """
+        conn = self.connect()
         cursor = conn.cursor()
         
-        cursor.execute('''
-            INSERT OR REPLACE INTO vehicles 
-            (plate_number, owner_name, vehicle_class, registration_date, balance, toll_pass, blacklisted, last_seen)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            vehicle_data['plate_number'],
-            vehicle_data['owner_name'],
-            vehicle_data['vehicle_class'],
-            vehicle_data['registration_date'],
-            vehicle_data['balance'],
-            vehicle_data['toll_pass'],
-            vehicle_data.get('blacklisted', False),
-            datetime.now().isoformat()
-        ))
+        indexes = cursor.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = 'vehicles' AND sql IS NOT NULL"
+        ).fetchall()
+        with conn:
+            for name, _ in indexes:
+                cursor.execute(f'DROP INDEX {name}')
         
-        conn.commit()
-        conn.close()
+        # A crash mid-load leaves a partial import to re-run, never a corrupt file
+        cursor.execute('PRAGMA synchronous = OFF')
+        cursor.execute('PRAGMA cache_size = -200000')
+        
+        written = uncommitted = 0
+        now = datetime.now().isoformat()
+        try:
+            for chunk in chunks:
+                cursor.executemany('''
+                    INSERT OR REPLACE INTO vehicles
+                    (plate_number, owner_name, vehicle_class, registration_date, balance, toll_pass, blacklisted, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (row + (now,) for row in chunk))
+                written += len(chunk)
+                uncommitted += len(chunk)
+                
+                if uncommitted >= commit_rows:
+                    conn.commit()
+                    uncommitted = 0
+                    now = datetime.now().isoformat()
+            conn.commit()
+        finally:
+            conn.rollback()
+            with conn:
+                for _, sql in indexes:
+                    cursor.execute(sql)
+            cursor.execute(f"PRAGMA synchronous = {self.pragmas['synchronous']}")
+            cursor.execute(f"PRAGMA cache_size = {self.pragmas['cache_size']}")
+            cursor.execute('ANALYZE vehicles')
+        
+        return written
+    
+    def update_balance(self, plate_number, balance):
+        """Set account balance and mark the vehicle as changed"""
+        conn = self.connect()
+        with conn:
+            cursor = conn.cursor()
+            
+            cursor.execute(
+                'UPDATE vehicles SET balance = ?, updated_at = ? WHERE plate_number = ?',
+                (balance, datetime.now().isoformat(), plate_number)
+            )
+    
+    def set_blacklisted(self, plate_number, blacklisted=True):
+        """Blacklist or clear a vehicle and mark it as changed"""
+        conn = self.connect()
+        with conn:
+            cursor = conn.cursor()
+            
+            cursor.execute(
+                'UPDATE vehicles SET blacklisted = ?, updated_at = ? WHERE plate_number = ?',
+                (blacklisted, datetime.now().isoformat(), plate_number)
+            )
     
-    def get_statistics(self):
-        """Get system statistics"""
-        conn = sqlite3.connect(self.db_path)
+    def apply_toll_debits(self, debits, transactions):
+        """Write a batch of toll debits and their transactions in one commit
         
-        # Total transactions
-        total = pd.read_sql("SELECT COUNT(*) as count FROM transactions", conn).iloc[0]['count']
+        debits maps plate_number to the total amount to subtract; balances are
+        decremented relative to the stored value so concurrent top-ups survive.
+        """
+        conn = self.connect()
+        with conn:
+            cursor = conn.cursor()
+            now = datetime.now().isoformat()
+            
+            cursor.executemany(
+                'UPDATE vehicles SET balance = balance - ?, last_seen = ?, updated_at = ? WHERE plate_number = ?',
+                [(amount, now, now, plate_number) for plate_number, amount in debits.items()]
+            )
+            cursor.executemany('''
+                INSERT INTO transactions
+                (timestamp, plate_number, vehicle_class, fraud_type, is_fraud, confidence, verified, toll_amount)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [
+                (
+                    transaction['timestamp'],
+                    transaction['plate_number'],
+                    transaction['vehicle_class'],
+                    transaction.get('fraud_type'),
+                    transaction.get('is_fraud', False),
+                    transaction.get('confidence', 0),
+                    True,
+                    transaction['toll_amount']
+                )
+                for transaction in transactions
+            ])
+            self.add_to_rollups(cursor, [
+                (
+                    transaction['timestamp'],
+                    transaction['vehicle_class'],
+                    transaction.get('is_fraud', False),
+                    transaction.get('fraud_type')
+                )
+                for transaction in transactions
+            ])
+    
+    def iter_vehicles(self, since=None, chunk_size=5000):
+        """Stream vehicle rows in chunks, optionally only those after an (updated_at, plate_number) watermark"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row
         
-        # Fraud transactions
-        fraud = pd.read_sql("SELECT COUNT(*) as count FROM transactions WHERE is_fraud = 1", conn).iloc[0]['count']
+        if since is None:
+            cursor.execute('SELECT * FROM vehicles')
+        else:
+            # Keyset on (updated_at, plate_number): rows sharing the watermark
+            # timestamp are not missed, and the watermark row is not read again
+            cursor.execute('''
+                SELECT * FROM vehicles
+                WHERE (updated_at, plate_number) > (?, ?)
+                ORDER BY updated_at, plate_number
+            ''', tuple(since))
         
-        # Fraud by type
-        fraud_by_type = pd.read_sql("""
-            SELECT fraud_type, COUNT(*) as count 
-            FROM transactions 
-            WHERE is_fraud = 1 
-            GROUP BY fraud_type
-        """, conn)
+        try:
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield [dict(row) for row in rows]
+        finally:
+            cursor.close()
+    
+    def get_statistics(self, start=None, end=None, include_archive=False):
+        """Get system statistics, optionally for transactions in [start, end)
         
-        # Hourly distribution
-        hourly = pd.read_sql("""
-            SELECT strftime('%H', timestamp) as hour, COUNT(*) as count 
-            FROM transactions 
-            GROUP BY hour 
-            ORDER BY hour
-        """, conn)
+        With include_archive, transactions already rolled out to the archive
+        are counted as well.
+        """
+        conn = self.connect()
+        total = fraud = 0
+        fraud_by_type, hourly, vehicles = {}, {}, {}
+        groups = []
+        
+        if start is None and end is None:
+            # Each breakdown is an ordered scan of a covering index; none touches the table
+            for is_fraud, fraud_type, count in conn.execute(
+                'SELECT is_fraud = 1, fraud_type, COUNT(*) FROM transactions GROUP BY is_fraud, fraud_type'
+            ):
+                total += count
+                if is_fraud:
+                    fraud += count
+                    fraud_by_type[fraud_type] = fraud_by_type.get(fraud_type, 0) + count
+            
+            vehicles.update(conn.execute(
+                'SELECT vehicle_class, COUNT(*) FROM transactions GROUP BY vehicle_class'
+            ))
+            
+            # Timestamps are ISO strings, so characters 12-13 are the hour
+            hourly.update(conn.execute("""
+                SELECT substr(timestamp, 12, 2) as hour, COUNT(*)
+                FROM transactions INDEXED BY idx_transactions_timestamp
+                GROUP BY hour
+            """))
+        else:
+            # A time range is one index range scan grouped by every dimension at once
+            conditions, params = [], []
+            if start is not None:
+                conditions.append('timestamp >= ?')
+                params.append(start.isoformat() if isinstance(start, datetime) else start)
+            if end is not None:
+                conditions.append('timestamp < ?')
+                params.append(end.isoformat() if isinstance(end, datetime) else end)
+            
+            groups = conn.execute(f"""
+                SELECT substr(timestamp, 12, 2) as hour, vehicle_class, is_fraud = 1, fraud_type, COUNT(*)
+                FROM transactions
+                WHERE {' AND '.join(conditions)}
+                GROUP BY hour, vehicle_class, is_fraud = 1, fraud_type
+            """, params).fetchall()
+        
+        if include_archive and self.archive is not None:
+            groups += self.archive.transaction_groups(start, end)
+        
+        for hour, vehicle_class, is_fraud, fraud_type, count in groups:
+            total += count
+            hourly[hour] = hourly.get(hour, 0) + count
+            vehicles[vehicle_class] = vehicles.get(vehicle_class, 0) + count
+            if is_fraud:
+                fraud += count
+                fraud_by_type[fraud_type] = fraud_by_type.get(fraud_type, 0) + count
+        
+        return {
+            'total_transactions': total,
+            'fraud_transactions': fraud,
+            'fraud_rate': (fraud / total * 100) if total > 0 else 0,
+            'fraud_by_type': [{'fraud_type': key, 'count': count} for key, count in fraud_by_type.items()],
+            'hourly_distribution': [
+                {'hour': hour, 'count': hourly[hour]}
+                for hour in sorted(hourly, key=lambda hour: (hour is not None, hour))
+            ],
+            'vehicle_distribution': [{'vehicle_class': key, 'count': count} for key, count in vehicles.items()]
+        }
+    
+    def get_rollup_statistics(self, start=None, end=None):
+        """Same figures as get_statistics, read from the hourly rollups
         
-        # Vehicle distribution
-        vehicles = pd.read_sql("""
-            SELECT vehicle_class, COUNT(*) as count 
-            FROM transactions 
-            GROUP BY vehicle_class
-        """, conn)
+        Costs one row per populated (hour, class, fraud type) bucket. start
+        and end are applied at hour granularity. Archiving does not decrement
+        the rollups, so these figures always include archived transactions.
+        """
+        conditions, params = [], []
+        if start is not None:
+            conditions.append('bucket >= ?')
+            params.append((start.isoformat() if isinstance(start, datetime) else start)[:13])
+        if end is not None:
+            conditions.append('bucket < ?')
+            params.append((end.isoformat() if isinstance(end, datetime) else end)[:13])
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
         
-        conn.close()
+        total = fraud = 0
+        fraud_by_type, hourly, vehicles = {}, {}, {}
+        for bucket, vehicle_class, is_fraud, fraud_type, count in self.connect().execute(f"""
+            SELECT bucket, vehicle_class, is_fraud, fraud_type, count
+            FROM transaction_rollups
+            {where}
+        """, params):
+            # Buckets are 'YYYY-MM-DDTHH'; the dashboard charts hour of day
+            hour = bucket[11:13] or None
+            vehicle_class = vehicle_class or None
+            
+            total += count
+            hourly[hour] = hourly.get(hour, 0) + count
+            vehicles[vehicle_class] = vehicles.get(vehicle_class, 0) + count
+            if is_fraud:
+                fraud += count
+                fraud_by_type[fraud_type or None] = fraud_by_type.get(fraud_type or None, 0) + count
         
         return {
-            'total_transactions': int(total),
-            'fraud_transactions': int(fraud),
+            'total_transactions': total,
+            'fraud_transactions': fraud,
             'fraud_rate': (fraud / total * 100) if total > 0 else 0,
-            'fraud_by_type': fraud_by_type.to_dict('records') if not fraud_by_type.empty else [],
-            'hourly_distribution': hourly.to_dict('records') if not hourly.empty else [],
-            'vehicle_distribution': vehicles.to_dict('records') if not vehicles.empty else []
+            'fraud_by_type': [{'fraud_type': key, 'count': count} for key, count in fraud_by_type.items()],
+            'hourly_distribution': [
+                {'hour': hour, 'count': hourly[hour]}
+                for hour in sorted(hourly, key=lambda hour: (hour is not None, hour))
+            ],
+            'vehicle_distribution': [{'vehicle_class': key, 'count': count} for key, count in vehicles.items()]
         }
     
     def get_recent_transactions(self, limit=100):
         """Get recent transactions"""
-        conn = sqlite3.connect(self.db_path)
+        return self.get_transactions_page(limit=limit)[0]
+    
+    def get_transactions_page(self, limit=100, after=None, plate_number=None, fraud_type=None, start=None, end=None):
+        """Return (rows, next_cursor) for one page of transactions, newest first
         
-        query = f"""
-            SELECT * FROM transactions 
-            ORDER BY timestamp DESC 
-            LIMIT {limit}
+        Pages are keyed on (timestamp, id): pass the returned next_cursor as
+        after to continue. Each page is an index seek, however deep it is.
+        next_cursor is None on the last page. Rows without a timestamp cannot
+        be keyed and are left out.
         """
+        limit = max(1, int(limit))
+        conditions, params = ['timestamp IS NOT NULL'], []
+        if after is not None:
+            conditions.append('(timestamp, id) < (?, ?)')
+            params.extend(after)
+        if plate_number is not None:
+            conditions.append('plate_number = ?')
+            params.append(plate_number)
+        if fraud_type is not None:
+            conditions.append('fraud_type = ?')
+            params.append(fraud_type)
+        if start is not None:
+            conditions.append('timestamp >= ?')
+            params.append(start.isoformat() if isinstance(start, datetime) else start)
+        if end is not None:
+            conditions.append('timestamp < ?')
+            params.append(end.isoformat() if isinstance(end, datetime) else end)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
         
-        df = pd.read_sql(query, conn)
-        conn.close()
+        cursor = self.connect().cursor()
+        cursor.row_factory = sqlite3.Row
+        cursor.execute(f"""
+            SELECT * FROM transactions
+            {where}
+            ORDER BY timestamp DESC, id DESC
+            LIMIT ?
+        """, params + [limit])
+        rows = [dict(row) for row in cursor]
         
-        return df.to_dict('records')
+        next_cursor = None
+        if len(rows) == limit:
+            next_cursor = (rows[-1]['timestamp'], rows[-1]['id'])
+        return rows, next_cursor
     
-    def log_fraud(self, plate_number, fraud_type, confidence, action_taken=None):
-        """Log fraud detection"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    def iter_transactions(self, chunk_size=1000, include_archive=False, **filters):
+        """Stream matching transactions newest first, one keyset page at a time
         
-        cursor.execute('''
-            INSERT INTO fraud_logs (timestamp, plate_number, fraud_type, confidence, action_taken)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (
+        With include_archive, archived transactions follow the hot ones; they
+        are always older, having been rolled out by age.
+        """
+        after = None
+        while True:
+            rows, after = self.get_transactions_page(limit=chunk_size, after=after, **filters)
+            yield from rows
+            if after is None:
+                break
+        
+        if include_archive and self.archive is not None:
+            yield from self.archive.iter_rows('transactions', **filters)
+    
+    def apply_retention(self, keep_days=90, batch_size=50000):
+        """Archive and delete transactions and fraud logs older than keep_days"""
+        if self.archive is None:
+            raise ValueError('Retention needs an archive_dir')
+        
+        # Queued rows may already be older than the cutoff
+        self.flush_writes()
+        cutoff = datetime.now() - timedelta(days=keep_days)
+        return self.archive.archive_before(cutoff, batch_size)
+    
+    def start_retention(self, keep_days=90, interval=3600.0):
+        """Apply retention now and then every interval seconds in a background thread"""
+        if self.archive is None:
+            raise ValueError('Retention needs an archive_dir')
+        if self.retention_thread is not None:
+            return
+        
+        self.retention_stop = threading.Event()
+        stop = self.retention_stop
+        
+        def run():
+            while True:
+                try:
+                    moved = self.apply_retention(keep_days)
+                    if any(moved.values()):
+                        print(f"Archived rows older than {keep_days} days: {moved}")
+                except Exception as e:
+                    print(f"Retention error: {e}")
+                if stop.wait(interval):
+                    break
+        
+        self.retention_thread = threading.Thread(target=run, name='db-retention', daemon=True)
+        self.retention_thread.start()
+    
+    def stop_retention(self):
+        """Stop the retention thread, letting a running pass finish"""
+        if self.retention_thread is not None:
+            self.retention_stop.set()
+            self.retention_thread.join()
+            self.retention_thread = None
+    
+    def log_fraud(self, plate_number, fraud_type, confidence, action_taken=None):
+        """Queue a fraud log entry for the next group commit"""
+        self.enqueue_write('fraud_logs', (
             datetime.now().isoformat(),
             plate_number,
             fraud_type,
             confidence,
             action_taken
         ))
-        
-        conn.commit()
-        conn.close()
     
     def resolve_fraud(self, log_id):
         """Mark fraud as resolved"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('UPDATE fraud_logs SET resolved = 1 WHERE id = ?', (log_id,))
-        
-        conn.commit()
-        conn.close()
\ No newline at end of file
+        conn = self.connect()
+        with conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('UPDATE fraud_logs SET resolved = 1 WHERE id = ?', (log_id,))
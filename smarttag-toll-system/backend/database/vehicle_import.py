@@ -0,0 +1,109 @@
+import argparse
+import os
+import time
+import pandas as pd
+import pyarrow.parquet as pq
+
+from database.database import DatabaseManager
+from models.plate_formats import PlateFormatEngine
+
+# Column order expected by DatabaseManager.bulk_load_vehicles
+IMPORT_COLUMNS = ['plate_number', 'owner_name', 'vehicle_class', 'registration_date', 'balance', 'toll_pass', 'blacklisted']
+
+# Columns an export must have; the others may be missing or empty
+REQUIRED_COLUMNS = ['plate_number', 'vehicle_class']
+
+# Spellings of a true blacklisted flag across CSV and Parquet exports
+TRUE_VALUES = ['1', '1.0', 'true', 'yes', 'y']
+
+def is_parquet(path):
+    return os.path.splitext(path)[1].lower() in ('.parquet', '.pq')
+
+def check_columns(path):
+    """Raise ValueError if the export lacks a required column"""
+    if is_parquet(path):
+        columns = pq.ParquetFile(path).schema_arrow.names
+    else:
+        columns = pd.read_csv(path, nrows=0).columns
+    missing = [name for name in REQUIRED_COLUMNS if name not in columns]
+    if missing:
+        raise ValueError(f"{path} is missing required column(s): {', '.join(missing)}")
+
+def read_vehicle_chunks(path, chunk_size=100000):
+    """Stream a CSV or Parquet vehicle export as DataFrames of chunk_size rows"""
+    if is_parquet(path):
+        parquet = pq.ParquetFile(path)
+        columns = [name for name in IMPORT_COLUMNS if name in parquet.schema_arrow.names]
+        for batch in parquet.iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size, dtype={'plate_number': str, 'toll_pass': str})
+
+def prepare_chunk(df, plate_formats):
+    """Validate and normalize one chunk, returning (rows, rejected plates, rejected balances)
+
+    Rows whose plate has no recognizable format, or whose balance is present
+    but not a number, are left out. A missing balance loads as 0.
+    """
+    df = df.reindex(columns=IMPORT_COLUMNS)
+    validated = plate_formats.validate_batch(df['plate_number'])
+    valid_plate = validated['is_valid'].to_numpy()
+
+    balances = pd.to_numeric(df['balance'], errors='coerce')
+    valid_balance = (balances.notna() | df['balance'].isna()).to_numpy()
+    valid = valid_plate & valid_balance
+
+    df = df[valid].copy()
+    df['plate_number'] = validated['plate_text'].to_numpy()[valid]
+    # An all-empty column reads as floats, so go through str before lowercasing
+    df['vehicle_class'] = df['vehicle_class'].fillna('').astype(str).str.strip().str.lower().mask(lambda s: s == '')
+    df['balance'] = balances[valid].fillna(0.0)
+    df['blacklisted'] = df['blacklisted'].astype(str).str.strip().str.lower().isin(TRUE_VALUES)
+
+    rows = list(df.astype(object).where(df.notna(), None).itertuples(index=False, name=None))
+    return rows, int((~valid_plate).sum()), int((valid_plate & ~valid_balance).sum())
+
+def import_vehicles(db, path, chunk_size=100000, plate_formats=None, progress=print):
+    """Bulk-load a vehicle export into the vehicles table
+
+    Plates are canonicalized; rows with no recognizable plate format or an
+    unparseable balance are skipped and counted. Returns counts and
+    throughput for the whole load.
+    """
+    check_columns(path)
+    plate_formats = plate_formats or PlateFormatEngine()
+    stats = {'rows_read': 0, 'rows_loaded': 0, 'rows_rejected': 0, 'invalid_plates': 0, 'invalid_balances': 0}
+    started = time.perf_counter()
+
+    def prepared():
+        for df in read_vehicle_chunks(path, chunk_size):
+            rows, invalid_plates, invalid_balances = prepare_chunk(df, plate_formats)
+            stats['rows_read'] += len(df)
+            stats['invalid_plates'] += invalid_plates
+            stats['invalid_balances'] += invalid_balances
+            stats['rows_rejected'] += invalid_plates + invalid_balances
+            yield rows
+
+            if progress is not None:
+                elapsed = time.perf_counter() - started
+                progress(f"{stats['rows_read']:,} rows read, {stats['rows_read'] / elapsed:,.0f} rows/s")
+
+    stats['rows_loaded'] = db.bulk_load_vehicles(prepared())
+    stats['seconds'] = time.perf_counter() - started
+    stats['rows_per_second'] = stats['rows_read'] / stats['seconds'] if stats['seconds'] > 0 else 0.0
+    return stats
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Bulk-load a FASTag vehicle export (CSV or Parquet)')
+    parser.add_argument('path')
+    parser.add_argument('--db', default='smarttag.db')
+    parser.add_argument('--chunk-size', type=int, default=100000)
+    args = parser.parse_args()
+
+    db = DatabaseManager(args.db, write_behind=False)
+    stats = import_vehicles(db, args.path, args.chunk_size)
+    db.close()
+
+    print(f"Loaded {stats['rows_loaded']:,} vehicles ({stats['invalid_plates']:,} invalid plates, "
+          f"{stats['invalid_balances']:,} invalid balances rejected) "
+          f"in {stats['seconds']:.1f}s, {stats['rows_per_second']:,.0f} rows/s")
@@ -0,0 +1,213 @@
+import json
+import os
+import shutil
+import time
+import numpy as np
+import pandas as pd
+
+from models.plate_matcher import FuzzyPlateIndex
+from models.vehicle_registry import VehicleRecord
+
+# Fixed-width, sorted plate keys let every worker binary-search the same pages
+REGISTRY_DTYPE = np.dtype([
+    ('plate_number', 'S16'),
+    ('class_code', 'u1'),
+    ('balance', '<f8'),
+    ('flags', 'u1'),
+    ('owner_name', 'S48'),
+    ('toll_pass', 'S16'),
+    ('registration_date', 'S10')
+])
+
+FLAG_BLACKLISTED = 1
+
+def _encode(values, width):
+    encoded = np.char.encode(np.asarray(values, dtype=object).astype(str), 'utf-8').astype(f'S{width}')
+    # Truncation can split a multibyte character; drop the partial bytes
+    return np.char.encode(np.char.decode(encoded, 'utf-8', 'ignore'), 'utf-8').astype(f'S{width}')
+
+def _decode(value):
+    return value.decode('utf-8') if value else None
+
+class ColumnarRegistry:
+    """Read-only registry backed by a memory-mapped columnar file
+
+    build() writes the file once; attach() maps it read-only, so every worker
+    process shares the same physical pages through the OS page cache instead
+    of holding its own pandas copy. Each build goes to its own version
+    directory and is published by atomically replacing the CURRENT file, so
+    readers always see one complete snapshot.
+    """
+
+    def __init__(self, table, vehicle_classes, directory=None, watermark=None, version=None):
+        self.table = table
+        self.vehicle_classes = list(vehicle_classes)
+        self.directory = directory
+        self.watermark = watermark
+        self.version = version
+        self._fuzzy = None
+
+    @classmethod
+    def build(cls, registry, directory):
+        """Write a registry snapshot to directory"""
+        os.makedirs(directory, exist_ok=True)
+        df = registry.to_dataframe().sort_values('plate_number', kind='stable')
+        vehicle_classes = sorted(df['vehicle_class'].dropna().unique().tolist())
+
+        table = np.zeros(len(df), dtype=REGISTRY_DTYPE)
+        table['plate_number'] = _encode(df['plate_number'], 16)
+        table['class_code'] = pd.Categorical(df['vehicle_class'], categories=vehicle_classes).codes + 1
+        table['balance'] = df['balance'].to_numpy(dtype=np.float64)
+        table['flags'] = np.where(df['blacklisted'].fillna(False).to_numpy(dtype=bool), FLAG_BLACKLISTED, 0)
+        table['owner_name'] = _encode(df['owner_name'].fillna(''), 48)
+        table['toll_pass'] = _encode(df['toll_pass'].fillna(''), 16)
+        table['registration_date'] = _encode(df['registration_date'].fillna(''), 10)
+
+        # Every file of the snapshot goes into a fresh version directory first
+        version = f'{time.time_ns():x}-{os.getpid()}'
+        version_dir = os.path.join(directory, version)
+        os.makedirs(version_dir)
+        np.save(os.path.join(version_dir, 'registry.npy'), table)
+        with open(os.path.join(version_dir, 'registry.json'), 'w') as f:
+            json.dump({
+                'vehicle_classes': vehicle_classes,
+                'size': len(table),
+                'watermark': registry.watermark
+            }, f)
+
+        # One rename publishes the whole snapshot
+        current_path = os.path.join(directory, 'CURRENT')
+        with open(current_path + '.tmp', 'w') as f:
+            f.write(version)
+        os.replace(current_path + '.tmp', current_path)
+
+        cls._remove_old_versions(directory, keep=2)
+        return cls.attach(directory)
+
+    @staticmethod
+    def current_version(directory):
+        """Name of the published snapshot version in directory"""
+        with open(os.path.join(directory, 'CURRENT')) as f:
+            return f.read().strip()
+
+    @classmethod
+    def _remove_old_versions(cls, directory, keep):
+        # The previous version stays for readers that resolved CURRENT just before the swap;
+        # mapped files of removed versions stay valid until their readers reattach
+        versions = sorted(
+            (entry for entry in os.scandir(directory) if entry.is_dir()),
+            key=lambda entry: int(entry.name.split('-')[0], 16)
+        )
+        for entry in versions[:-keep]:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+    @classmethod
+    def attach(cls, directory):
+        """Map the published registry read-only; costs a few page faults, not a load"""
+        version = cls.current_version(directory)
+        version_dir = os.path.join(directory, version)
+        with open(os.path.join(version_dir, 'registry.json')) as f:
+            meta = json.load(f)
+
+        return cls(
+            np.load(os.path.join(version_dir, 'registry.npy'), mmap_mode='r'),
+            meta['vehicle_classes'],
+            directory,
+            meta.get('watermark'),
+            version
+        )
+
+    def reattach_if_changed(self):
+        """Pick up a snapshot rebuilt by another process, returning True if it changed"""
+        if self.directory is None:
+            return False
+        if self.current_version(self.directory) == self.version:
+            return False
+
+        fresh = self.attach(self.directory)
+        self.__dict__.update(fresh.__dict__)
+        return True
+
+    def _positions(self, plate_numbers):
+        keys = _encode(plate_numbers, 16)
+        positions = np.searchsorted(self.table['plate_number'], keys)
+        positions = np.minimum(positions, max(len(self.table) - 1, 0))
+
+        found = np.zeros(len(keys), dtype=bool)
+        if len(self.table):
+            found = self.table['plate_number'][positions] == keys
+
+        # Keys longer than the fixed width were truncated and cannot be registered
+        lengths = np.char.str_len(np.asarray(plate_numbers, dtype=object).astype(str))
+        return positions, found & (lengths <= 16)
+
+    def _record(self, row):
+        return VehicleRecord(
+            plate_number=_decode(row['plate_number']),
+            owner_name=_decode(row['owner_name']),
+            vehicle_class=self.vehicle_classes[row['class_code'] - 1] if row['class_code'] else None,
+            balance=float(row['balance']),
+            blacklisted=bool(row['flags'] & FLAG_BLACKLISTED),
+            toll_pass=_decode(row['toll_pass']),
+            registration_date=_decode(row['registration_date'])
+        )
+
+    def lookup(self, plate_number):
+        """Return the VehicleRecord for a plate, or None if unregistered"""
+        positions, found = self._positions([plate_number])
+        if not found[0]:
+            return None
+        return self._record(self.table[positions[0]])
+
+    def match(self, plate_text, min_score=0.0):
+        """Return (record, score) for the nearest registered plate, exact hits score 1.0"""
+        record = self.lookup(plate_text)
+        if record is not None:
+            return record, 1.0
+
+        # The fuzzy index is per process and built only if a worker needs it
+        if self._fuzzy is None:
+            self._fuzzy = FuzzyPlateIndex(np.char.decode(self.table['plate_number'], 'utf-8').tolist())
+
+        plate_number, score = self._fuzzy.best_match(plate_text, min_score)
+        if plate_number is None:
+            return None, 0.0
+        return self.lookup(plate_number), score
+
+    def contains_batch(self, plate_numbers):
+        """Vectorized membership test for an array of plates"""
+        return self._positions(np.asarray(plate_numbers, dtype=object))[1]
+
+    def lookup_batch(self, plate_numbers):
+        """Join an array of plates against the registry in one vectorized pass"""
+        plate_numbers = np.asarray(plate_numbers, dtype=object)
+        positions, registered = self._positions(plate_numbers)
+
+        if len(self.table) == 0:
+            rows = np.zeros(len(plate_numbers), dtype=REGISTRY_DTYPE)
+        else:
+            rows = self.table[positions]
+
+        class_names = np.array([None] + self.vehicle_classes, dtype=object)
+        result = {'plate_number': plate_numbers, 'registered': registered}
+        for field in ('owner_name', 'toll_pass'):
+            values = np.char.decode(rows[field], 'utf-8').astype(object)
+            result[field] = np.where(registered, values, None)
+        result['vehicle_class'] = np.where(registered, class_names[rows['class_code']], None)
+        result['balance'] = np.where(registered, rows['balance'], np.nan)
+        result['blacklisted'] = registered & ((rows['flags'] & FLAG_BLACKLISTED) > 0)
+
+        return pd.DataFrame(result)
+
+    def to_dataframe(self):
+        """Export registry contents as a DataFrame"""
+        return pd.DataFrame([self._record(row) for row in self.table], columns=VehicleRecord._fields)
+
+    def __contains__(self, plate_number):
+        return self.lookup(plate_number) is not None
+
+    def __len__(self):
+        return len(self.table)
+
+    def __iter__(self):
+        return (self._record(row) for row in self.table)
@@ -0,0 +1,134 @@
+import argparse
+import glob
+import os
+import time
+import cv2
+import numpy as np
+
+from models.vehicle_tracker import iou_matrix
+
+def load_frames(source, limit=200):
+    """Frames from a video file or a directory of images"""
+    if os.path.isdir(source):
+        paths = sorted(
+            path for path in glob.glob(os.path.join(source, '*'))
+            if path.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp'))
+        )
+        return [frame for frame in (cv2.imread(path) for path in paths[:limit]) if frame is not None]
+
+    frames = []
+    capture = cv2.VideoCapture(source)
+    while len(frames) < limit:
+        ok, frame = capture.read()
+        if not ok:
+            break
+        frames.append(frame)
+    capture.release()
+    return frames
+
+def time_detector(detector, frames, warmup=5):
+    """Per-frame detections and latency summary in milliseconds"""
+    for frame in frames[:warmup]:
+        detector.detect(frame)
+
+    detections, latencies = [], []
+    for frame in frames:
+        started = time.perf_counter()
+        detections.append(detector.detect(frame))
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    latencies = np.array(latencies)
+    return detections, {
+        'mean_ms': float(latencies.mean()),
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p95_ms': float(np.percentile(latencies, 95)),
+        'fps': float(1000 / latencies.mean())
+    }
+
+def agreement(reference, candidate, iou_threshold=0.5):
+    """How closely candidate detections reproduce the reference ones
+
+    Boxes of the same class are paired greedily by IoU. agreement is
+    2 * matched / (reference + candidate boxes), so 1.0 means identical
+    detections; mean_iou and mean_confidence_delta describe the matched pairs.
+    """
+    matched, total, ious, confidence_deltas = 0, 0, [], []
+
+    for expected, actual in zip(reference, candidate):
+        total += len(expected) + len(actual)
+        if not expected or not actual:
+            continue
+
+        overlaps = iou_matrix(
+            np.array([vehicle['bbox'] for vehicle in expected], dtype=np.float64),
+            np.array([vehicle['bbox'] for vehicle in actual], dtype=np.float64)
+        )
+        same_class = np.array([[a['class'] == b['class'] for b in actual] for a in expected])
+        overlaps = np.where(same_class, overlaps, 0.0)
+
+        used_expected, used_actual = set(), set()
+        for i, j in zip(*np.unravel_index(np.argsort(-overlaps, axis=None), overlaps.shape)):
+            if overlaps[i, j] < iou_threshold:
+                break
+            if i in used_expected or j in used_actual:
+                continue
+            used_expected.add(i)
+            used_actual.add(j)
+            ious.append(overlaps[i, j])
+            confidence_deltas.append(abs(expected[i]['confidence'] - actual[j]['confidence']))
+
+        matched += len(used_expected)
+
+    return {
+        'agreement': 2 * matched / total if total else 1.0,
+        'mean_iou': float(np.mean(ious)) if ious else 0.0,
+        'mean_confidence_delta': float(np.mean(confidence_deltas)) if confidence_deltas else 0.0
+    }
+
+def run_benchmark(model_path, frames, quantize=False, calibration=0):
+    """Latency of the PyTorch and ONNX Runtime backends and their agreement, by backend name"""
+    from models.onnx_detector import OnnxVehicleDetector
+    from models.vehicle_detector import VehicleDetector
+
+    backends = {
+        'pytorch': lambda: VehicleDetector(model_path),
+        'onnx': lambda: OnnxVehicleDetector(model_path)
+    }
+    if quantize:
+        backends['onnx-int8'] = lambda: OnnxVehicleDetector(
+            model_path, quantize=True, calibration_frames=frames[:calibration] if calibration else None
+        )
+
+    results, reference = {}, None
+    for name, build in backends.items():
+        started = time.perf_counter()
+        detector = build()
+        load_seconds = time.perf_counter() - started
+
+        detections, stats = time_detector(detector, frames)
+        stats['load_s'] = load_seconds
+        if reference is None:
+            reference = detections
+        stats.update(agreement(reference, detections))
+        results[name] = stats
+
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare PyTorch and ONNX Runtime vehicle detection')
+    parser.add_argument('source', help='video file or directory of images')
+    parser.add_argument('--model', default='../ml_models/yolov8n.pt')
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--int8', action='store_true', help='also benchmark the INT8-quantized model')
+    parser.add_argument('--calibration', type=int, default=0,
+                        help='calibrate INT8 activations on this many frames (static quantization)')
+    args = parser.parse_args()
+
+    frames = load_frames(args.source, args.frames)
+    results = run_benchmark(args.model, frames, args.int8, args.calibration)
+
+    print(f"{len(frames)} frames from {args.source}")
+    print(f"{'backend':<10} {'load s':>7} {'mean ms':>8} {'p50 ms':>7} {'p95 ms':>7} {'fps':>6} {'agree':>6} {'IoU':>5}")
+    for name, stats in results.items():
+        print(f"{name:<10} {stats['load_s']:>7.1f} {stats['mean_ms']:>8.1f} {stats['p50_ms']:>7.1f} "
+              f"{stats['p95_ms']:>7.1f} {stats['fps']:>6.1f} {stats['agreement']:>6.3f} {stats['mean_iou']:>5.3f}")
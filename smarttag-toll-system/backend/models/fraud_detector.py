@@ -3,8 +3,14 @@ import numpy as np
 from datetime import datetime
 import random
 
+from models.fraud_rules import FraudRuleEngine
+from models.plate_matcher import normalize_plate
+from models.sighting_window import SightingWindow
+from models.toll_ledger import TollLedger
+from models.vehicle_registry import VehicleRegistry
+
 class FraudDetector:
-    def __init__(self):
+    def __init__(self, db=None, registry=None):
         self.fraud_types = {
             'CLASS_MISMATCH': 'Vehicle Class Mismatch',
             'UNREGISTERED': 'Unregistered Vehicle',
@@ -14,9 +20,43 @@ class FraudDetector:
             'LANE_VIOLATION': 'Lane Violation'
         }
         
-        # Simulated FASTag database
-        self.registered_vehicles = self.create_sample_database()
+        # FASTag registry indexed by plate for O(1) lookups. Worker processes
+        # pass an attached ColumnarRegistry to share one memory-mapped copy.
+        self.registry = registry if registry is not None else self.load_registry(db)
+        
+        # OCR readings that differ from a registered plate only by look-alike
+        # characters are treated as that plate when they score at least this.
+        # Each slip costs a quarter edit, so up to six on a 10 character plate.
+        # A reading one real edit away is a different plate, kept for review.
+        self.min_match_score = 0.85
+        
+        # Recent sightings per lane, used to suppress repeats and flag duplicates.
+        # Replays carry their own timestamps, so they get a separate window.
+        self.sightings = SightingWindow(window_seconds=30.0)
+        self.replay_sightings = SightingWindow(window_seconds=30.0)
+        
+        # Live balances and class tolls; debits are written to the database in batches
+        self.ledger = TollLedger(self.registry, db)
+        if db is not None:
+            self.ledger.start()
+        
+        # Declarative fraud checks, compiled once and evaluated together
+        self.rules = FraudRuleEngine()
+        
+    def load_registry(self, db=None):
+        """Load the registry from the vehicles table, seeding it with samples when empty"""
+        if db is None:
+            return VehicleRegistry.from_dataframe(self.create_sample_database())
         
+        registry = VehicleRegistry.from_database(db)
+        if len(registry) == 0:
+            db.save_vehicles(self.create_sample_database().to_dict('records'))
+            registry.refresh_from_database(db, full=True)
+        
+        # Keep blacklist and balance changes flowing in without a restart
+        registry.start_auto_refresh(db)
+        return registry
+    
     def create_sample_database(self):
         """Create sample FASTag database"""
         vehicles = []
@@ -46,158 +86,242 @@ class FraudDetector:
         
         return pd.DataFrame(vehicles)
     
-    def check_fraud(self, plates, vehicles):
-        """Check for fraudulent activities"""
-        fraud_results = []
-        timestamp = datetime.now()
+    def check_fraud(self, plates, vehicles, lane_id=None):
+        """Check for fraudulent activities
+        
+        With a lane_id, first sightings of clean registered vehicles are also
+        charged their toll through the ledger.
+        """
+        # Plates are matched to vehicles by position, missing ones stay None
+        plate_texts = [plates[i]['text'] if i < len(plates) else None for i in range(len(vehicles))]
+        plate_valid = [plates[i]['is_valid'] if i < len(plates) else False for i in range(len(vehicles))]
+        plate_formats = [plates[i].get('plate_format') if i < len(plates) else None for i in range(len(vehicles))]
+        detected_classes = [vehicle['class'] for vehicle in vehicles]
+        
+        lane_ids = None if lane_id is None else [lane_id] * len(vehicles)
+        batch = self.check_fraud_batch(plate_texts, plate_valid, detected_classes, lane_ids=lane_ids)
         
-        for i, vehicle in enumerate(vehicles):
+        fraud_results = []
+        for vehicle, plate_format, matched_plate, candidate_plate, is_fraud, fraud_type, fraud_flags, confidence, timestamp, is_repeat in zip(
+            vehicles, plate_formats, batch['matched_plate'], batch['candidate_plate'], batch['is_fraud'],
+            batch['fraud_type'], batch['fraud_flags'], batch['confidence'], batch['timestamp'], batch['is_repeat']
+        ):
             fraud_info = {
                 'vehicle_class': vehicle['class'],
                 'bbox': vehicle['bbox'],
                 'location': (vehicle['bbox'][0], vehicle['bbox'][1]),
-                'is_fraud': False,
-                'fraud_type': None,
-                'confidence': 0,
-                'timestamp': timestamp.isoformat()
+                'is_fraud': bool(is_fraud),
+                'fraud_type': fraud_type if is_fraud else None,
+                # Every rule that fired, highest priority first
+                'fraud_flags': list(fraud_flags),
+                'confidence': float(confidence),
+                'timestamp': timestamp,
+                'plate_format': plate_format,
+                # Closest registered plate when the reading is one real edit off
+                'candidate_plate': candidate_plate,
+                # Same vehicle still in the lane, callers should not log it again
+                'is_repeat': bool(is_repeat)
             }
             
-            # Check if plate was detected for this vehicle
-            plate_found = False
-            plate_text = None
-            
-            if i < len(plates):
-                plate_found = True
-                plate_text = plates[i]['text']
-            
-            # Check for different fraud scenarios
-            if plate_found and plate_text:
-                # Check if vehicle is registered
-                registered = self.check_registration(plate_text)
+            # Charge each verified passage once, when the vehicle first appears in the lane
+            if lane_id is not None and not is_fraud and not is_repeat and isinstance(matched_plate, str):
+                toll = self.ledger.debit(matched_plate, vehicle['class'], {
+                    'timestamp': timestamp,
+                    'confidence': fraud_info['confidence']
+                })
+                fraud_info['toll'] = toll
                 
-                if not registered:
+                if toll['status'] == TollLedger.INSUFFICIENT_BALANCE:
                     fraud_info['is_fraud'] = True
-                    fraud_info['fraud_type'] = self.fraud_types['UNREGISTERED']
-                    fraud_info['confidence'] = 0.95
-                
-                else:
-                    # Check class mismatch
-                    mismatch = self.check_class_mismatch(plate_text, vehicle['class'])
-                    if mismatch:
-                        fraud_info['is_fraud'] = True
-                        fraud_info['fraud_type'] = self.fraud_types['CLASS_MISMATCH']
-                        fraud_info['confidence'] = 0.9
-                    
-                    # Check blacklist
-                    blacklisted = self.check_blacklist(plate_text)
-                    if blacklisted:
-                        fraud_info['is_fraud'] = True
-                        fraud_info['fraud_type'] = 'Blacklisted Vehicle'
-                        fraud_info['confidence'] = 1.0
-                    
-                    # Check low balance
-                    low_balance = self.check_balance(plate_text)
-                    if low_balance:
-                        fraud_info['is_fraud'] = True
-                        fraud_info['fraud_type'] = 'Insufficient Balance'
-                        fraud_info['confidence'] = 1.0
-            
-            elif plate_found and not plates[i]['is_valid']:
-                # Invalid plate format
-                fraud_info['is_fraud'] = True
-                fraud_info['fraud_type'] = self.fraud_types['INVALID_PLATE']
-                fraud_info['confidence'] = 0.8
-            
-            else:
-                # No plate detected
-                fraud_info['is_fraud'] = True
-                fraud_info['fraud_type'] = 'No License Plate Detected'
-                fraud_info['confidence'] = 0.7
+                    fraud_info['fraud_type'] = 'Insufficient Balance'
+                    fraud_info['fraud_flags'].append('LOW_BALANCE')
+                    fraud_info['confidence'] = 1.0
             
             fraud_results.append(fraud_info)
         
         return fraud_results
     
+    def check_fraud_batch(self, plate_texts, plate_valid, detected_classes, timestamps=None, lane_ids=None):
+        """Evaluate fraud for columnar detections from many frames in one pass
+        
+        When lane_ids is given, detections must be in time order and are fed
+        through the sighting window to mark repeats and cross-lane duplicates.
+        Live detections (no timestamps) use the live window; replays with
+        their own timestamps use the replay window.
+        """
+        plate_texts = pd.Series(plate_texts, dtype=object)
+        plate_valid = np.asarray(plate_valid, dtype=bool)
+        detected_classes = np.asarray(detected_classes, dtype=object)
+        
+        sightings = self.replay_sightings
+        if timestamps is None:
+            timestamps = np.full(len(plate_texts), datetime.now().isoformat(), dtype=object)
+            sightings = self.sightings
+        
+        plate_found = plate_texts.notna().to_numpy()
+        lookup_plates = plate_texts.fillna('')
+        has_text = plate_found & (lookup_plates.str.len() > 0).to_numpy()
+        match_scores = self.registry.contains_batch(lookup_plates).astype(np.float64)
+        
+        # Resolve exact-match misses through the fuzzy index, once per distinct text.
+        # Only look-alike slips resolve to a plate; other near misses stay
+        # unregistered and carry the closest plate as a review candidate.
+        candidate_plates = np.full(len(plate_texts), None, dtype=object)
+        candidate_scores = np.zeros(len(plate_texts), dtype=np.float64)
+        misses = has_text & (match_scores == 0)
+        if misses.any():
+            fuzzy_matches = {text: self.resolve_reading(text) for text in lookup_plates[misses].unique()}
+            resolved = [fuzzy_matches[text] for text in lookup_plates[misses]]
+            lookup_plates[misses] = [plate if same else '' for plate, _, same in resolved]
+            match_scores[misses] = [score if same else 0.0 for _, score, same in resolved]
+            candidate_plates[misses] = [None if same else plate for plate, _, same in resolved]
+            candidate_scores[misses] = [0.0 if same or plate is None else score for plate, score, same in resolved]
+        
+        # One vectorized join against the registry for every detection
+        records = self.registry.lookup_batch(lookup_plates)
+        registered = records['registered'].to_numpy()
+        
+        is_repeat = np.zeros(len(plate_texts), dtype=bool)
+        duplicate = np.zeros(len(plate_texts), dtype=bool)
+        if lane_ids is not None:
+            lane_ids = np.asarray(lane_ids, dtype=object)
+            seen_at = pd.to_datetime(pd.Series(timestamps)).map(datetime.timestamp).to_numpy()
+            sighting_plates = np.where(registered, lookup_plates.to_numpy(), plate_texts.to_numpy())
+            
+            for i in np.flatnonzero(has_text):
+                status = sightings.observe(sighting_plates[i], lane_ids[i], seen_at[i])
+                is_repeat[i] = status == SightingWindow.REPEAT
+                duplicate[i] = status == SightingWindow.DUPLICATE
+        
+        # Live ledger balances (with unflushed debits) win over registry snapshots
+        balances = lookup_plates.map(self.ledger.balances.get).to_numpy(dtype=np.float64)
+        balances = np.where(np.isnan(balances), records['balance'].to_numpy(dtype=np.float64), balances)
+        tolls = records['vehicle_class'].map(self.ledger.toll_for).to_numpy(dtype=np.float64)
+        
+        # All rules run over the same joined columns; checks against a
+        # fuzzy-matched record are only as sure as the match
+        outcome = self.rules.evaluate_frame(self.rules.build_context(
+            len(plate_texts),
+            plate_found=plate_found,
+            has_text=has_text,
+            plate_valid=plate_valid,
+            registered=registered,
+            blacklisted=records['blacklisted'].to_numpy(dtype=bool),
+            balance=balances,
+            toll=tolls,
+            registered_class=records['vehicle_class'].to_numpy(),
+            detected_class=detected_classes,
+            duplicate=duplicate,
+            match_score=match_scores,
+            near_match=pd.notna(candidate_plates)
+        ))
+        
+        return pd.DataFrame({
+            'plate_text': plate_texts.to_numpy(),
+            'matched_plate': records['plate_number'].where(records['registered'], None).to_numpy(),
+            'match_score': match_scores,
+            'candidate_plate': candidate_plates,
+            'candidate_score': candidate_scores,
+            'vehicle_class': detected_classes,
+            'registered_class': records['vehicle_class'].to_numpy(),
+            'owner_name': records['owner_name'].to_numpy(),
+            'balance': np.where(registered, balances, np.nan),
+            'blacklisted': records['blacklisted'].to_numpy(),
+            'is_fraud': outcome['is_fraud'],
+            'fraud_type': outcome['fraud_type'],
+            'fraud_flags': outcome['fraud_flags'],
+            'confidence': outcome['confidence'],
+            'is_repeat': is_repeat,
+            'timestamp': np.asarray(timestamps, dtype=object)
+        })
+    
+    def resolve_reading(self, plate_text):
+        """Closest registered plate for an OCR reading that missed the index
+        
+        Returns (plate, score, same_vehicle). same_vehicle is True only when
+        every difference is a look-alike slip under normalize_plate; a plate
+        with a real edit is a review candidate and is never charged.
+        """
+        record, score = self.registry.match(plate_text)
+        if record is None:
+            return None, 0.0, False
+        
+        same_vehicle = (normalize_plate(plate_text) == normalize_plate(record.plate_number)
+                        and score >= self.min_match_score)
+        return record.plate_number, score, same_vehicle
+    
     def check_registration(self, plate_number):
         """Check if vehicle is registered"""
-        return plate_number in self.registered_vehicles['plate_number'].values
+        return plate_number in self.registry
     
     def check_class_mismatch(self, plate_number, detected_class):
         """Check if detected class matches registered class"""
-        vehicle_data = self.registered_vehicles[
-            self.registered_vehicles['plate_number'] == plate_number
-        ]
+        record = self.registry.lookup(plate_number)
         
-        if len(vehicle_data) > 0:
-            registered_class = vehicle_data.iloc[0]['vehicle_class']
-            return registered_class != detected_class
+        if record is not None:
+            return record.vehicle_class != detected_class
         
         return False
     
     def check_blacklist(self, plate_number):
         """Check if vehicle is blacklisted"""
-        vehicle_data = self.registered_vehicles[
-            self.registered_vehicles['plate_number'] == plate_number
-        ]
+        record = self.registry.lookup(plate_number)
         
-        if len(vehicle_data) > 0:
-            return vehicle_data.iloc[0]['blacklisted']
+        if record is not None:
+            return record.blacklisted
         
         return False
     
     def check_balance(self, plate_number):
         """Check if account has sufficient balance"""
-        vehicle_data = self.registered_vehicles[
-            self.registered_vehicles['plate_number'] == plate_number
-        ]
+        record = self.registry.lookup(plate_number)
         
-        if len(vehicle_data) > 0:
-            return vehicle_data.iloc[0]['balance'] < 200  # Minimum toll amount
+        if record is not None:
+            return self.ledger.balance(plate_number) < self.ledger.toll_for(record.vehicle_class)
         
         return False
     
     def verify_vehicle(self, plate_number, detected_class):
         """Verify vehicle details"""
-        vehicle_data = self.registered_vehicles[
-            self.registered_vehicles['plate_number'] == plate_number
-        ]
-        
-        if len(vehicle_data) == 0:
-            return {
-                'verified': False,
-                'message': 'Vehicle not registered in FASTag system',
-                'status': 'UNREGISTERED'
-            }
+        vehicle = self.registry.lookup(plate_number)
         
-        vehicle = vehicle_data.iloc[0]
+        balance = self.ledger.balance(plate_number) if vehicle is not None else None
+        fired = self.rules.evaluate_record(
+            plate_found=True,
+            has_text=True,
+            plate_valid=True,
+            registered=vehicle is not None,
+            blacklisted=vehicle is not None and bool(vehicle.blacklisted),
+            balance=balance if balance is not None else np.nan,
+            toll=self.ledger.toll_for(vehicle.vehicle_class) if vehicle is not None else np.nan,
+            registered_class=vehicle.vehicle_class if vehicle is not None else None,
+            detected_class=detected_class,
+            match_score=1.0
+        )
         
-        if vehicle['blacklisted']:
-            return {
-                'verified': False,
-                'message': 'Vehicle is blacklisted',
-                'status': 'BLACKLISTED'
-            }
-        
-        if vehicle['balance'] < 200:
-            return {
-                'verified': False,
-                'message': f'Insufficient balance: ₹{vehicle["balance"]}',
-                'status': 'LOW_BALANCE'
-            }
+        # Report the highest-priority failure, but keep every rule that fired
+        messages = {
+            'UNREGISTERED': 'Vehicle not registered in FASTag system',
+            'BLACKLISTED': 'Vehicle is blacklisted',
+            'LOW_BALANCE': f'Insufficient balance: ₹{balance}',
+            'CLASS_MISMATCH': f'Class mismatch: Registered as {vehicle.vehicle_class if vehicle is not None else None}'
+        }
+        failures = [rule.name for rule in fired if rule.name in messages]
         
-        if vehicle['vehicle_class'] != detected_class:
+        if failures:
             return {
                 'verified': False,
-                'message': f'Class mismatch: Registered as {vehicle["vehicle_class"]}',
-                'status': 'CLASS_MISMATCH'
+                'message': messages[failures[0]],
+                'status': failures[0],
+                'fraud_flags': failures
             }
         
         return {
             'verified': True,
             'message': 'Vehicle verified successfully',
             'status': 'VERIFIED',
-            'owner': vehicle['owner_name'],
-            'balance': vehicle['balance']
+            'owner': vehicle.owner_name,
+            'balance': balance
         }
     
     def generate_summary(self, results):
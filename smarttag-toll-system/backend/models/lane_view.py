@@ -0,0 +1,91 @@
+import json
+import os
+import threading
+import cv2
+import numpy as np
+
+class LaneView:
+    """Region of interest and processing resolution of one lane camera
+
+    polygon is a list of [x, y] points as fractions of the frame width and
+    height, so one configuration fits any stream resolution. Detection sees
+    only the polygon's bounding box, downscaled to at most process_width
+    pixels wide, with everything outside the polygon masked; the vehicles it
+    finds are mapped back to full-frame coordinates so OCR and annotation keep
+    working on the original pixels. max_vehicles keeps the largest detections.
+    """
+
+    def __init__(self, polygon=None, process_width=None, max_vehicles=None):
+        self.polygon = np.asarray(polygon, dtype=np.float64) if polygon is not None else None
+        self.process_width = process_width
+        self.max_vehicles = max_vehicles
+
+        # Frame shape -> (x, y, w, h, scale, size, mask); streams rarely change size
+        self.layouts = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config.get('polygon'), config.get('process_width'), config.get('max_vehicles'))
+
+    def layout(self, shape):
+        """Region box, downscale factor and polygon mask at processing size for frames of shape"""
+        key = shape[:2]
+        with self.lock:
+            if key not in self.layouts:
+                self.layouts[key] = self._layout(*key)
+            return self.layouts[key]
+
+    def _layout(self, height, width):
+        points = None
+        x, y, w, h = 0, 0, width, height
+        if self.polygon is not None:
+            points = np.round(self.polygon * [width, height]).astype(np.int32)
+            points = np.clip(points, 0, [width - 1, height - 1])
+            x, y, w, h = cv2.boundingRect(points)
+
+        scale = min(1.0, self.process_width / w) if self.process_width else 1.0
+        size = (max(1, round(w * scale)), max(1, round(h * scale)))
+
+        mask = None
+        if points is not None:
+            mask = np.zeros((size[1], size[0]), dtype=np.uint8)
+            cv2.fillPoly(mask, [np.round((points - [x, y]) * scale).astype(np.int32)], 255)
+
+        return x, y, w, h, scale, size, mask
+
+    def detect(self, frame, detector):
+        """Run detector(region, mask, scale) on the lane region and map its vehicles to frame coordinates
+
+        detector gets the cropped, downscaled region, the polygon mask at the
+        same size (or None) and the downscale factor, and returns vehicles in
+        region coordinates, largest first.
+        """
+        x, y, w, h, scale, size, mask = self.layout(frame.shape)
+        region = frame[y:y+h, x:x+w]
+        if scale < 1.0:
+            region = cv2.resize(region, size, interpolation=cv2.INTER_AREA)
+
+        vehicles = detector(region, mask, scale)
+        if self.max_vehicles is not None:
+            vehicles = vehicles[:self.max_vehicles]
+
+        for vehicle in vehicles:
+            x1, y1, x2, y2 = vehicle['bbox']
+            vehicle['bbox'] = [x + int(x1 / scale), y + int(y1 / scale), x + int(x2 / scale), y + int(y2 / scale)]
+            vehicle['center'] = [(vehicle['bbox'][0] + vehicle['bbox'][2]) // 2, (vehicle['bbox'][1] + vehicle['bbox'][3]) // 2]
+
+        return vehicles
+
+def load_lane_views(path):
+    """LaneViews by lane id from a JSON file, or {} if it does not exist
+
+    The file maps lane ids to {"polygon": [[x, y], ...], "process_width": 640,
+    "max_vehicles": 3}; every key is optional.
+    """
+    if not os.path.exists(path):
+        return {}
+
+    with open(path) as f:
+        config = json.load(f)
+    return {lane_id: LaneView.from_config(lane) for lane_id, lane in config.items()}
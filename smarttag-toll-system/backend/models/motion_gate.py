@@ -0,0 +1,70 @@
+import threading
+import cv2
+import numpy as np
+
+class MotionGate:
+    """Skips the pipeline for lane frames that did not change since the last processed one
+
+    Frames are compared on a small blurred grayscale copy. Each frame is
+    diffed against the last frame that was actually processed rather than the
+    previous one, so slow movement still adds up to a trigger. Unchanged frames
+    get the previous result back; every max_skipped-th frame is processed
+    anyway so the result never goes stale indefinitely.
+    """
+
+    def __init__(self, width=160, pixel_threshold=25, min_changed=0.005, max_skipped=50):
+        self.width = width
+        self.pixel_threshold = pixel_threshold  # gray-level change that counts as motion
+        self.min_changed = min_changed          # share of changed pixels that triggers processing
+        self.max_skipped = max_skipped
+
+        self.reference = None
+        self.result = None
+        self.skipped_in_row = 0
+        self.lock = threading.Lock()
+        self.stats = {'frames': 0, 'processed': 0, 'skipped': 0}
+
+    def changed(self, frame):
+        """Whether frame differs enough from the reference frame; updates the reference when it does"""
+        small = self._thumbnail(frame)
+        if self.reference is None or self.reference.shape != small.shape:
+            self.reference = small
+            return True
+
+        moving = cv2.absdiff(small, self.reference) > self.pixel_threshold
+        if np.count_nonzero(moving) < self.min_changed * moving.size and self.skipped_in_row < self.max_skipped:
+            return False
+
+        self.reference = small
+        return True
+
+    def process(self, frame, handler):
+        """handler(frame) if the frame changed, else the previous result; returns (result, processed)"""
+        with self.lock:
+            self.stats['frames'] += 1
+            if self.result is not None and not self.changed(frame):
+                self.skipped_in_row += 1
+                self.stats['skipped'] += 1
+                return self.result, False
+
+            # First frame: set the reference even though it is always processed
+            if self.result is None:
+                self.changed(frame)
+
+            self.result = handler(frame)
+            self.skipped_in_row = 0
+            self.stats['processed'] += 1
+            return self.result, True
+
+    def _thumbnail(self, frame):
+        height, width = frame.shape[:2]
+        small = cv2.resize(frame, (self.width, max(1, height * self.width // width)), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def get_stats(self):
+        """Frame counts and the share of frames that skipped the pipeline"""
+        with self.lock:
+            stats = dict(self.stats)
+        stats['skip_ratio'] = stats['skipped'] / stats['frames'] if stats['frames'] else 0.0
+        return stats
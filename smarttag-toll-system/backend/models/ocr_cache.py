@@ -0,0 +1,119 @@
+from collections import OrderedDict
+import threading
+import time
+import cv2
+import numpy as np
+
+# Set bits per byte value, for Hamming distances between packed hashes
+POPCOUNT = np.array([bin(value).count('1') for value in range(256)], dtype=np.uint16)
+
+class OCRCache:
+    """LRU cache of OCR results keyed by a difference hash of the plate crop
+
+    Crops are binarized before hashing so sensor noise on the plate background
+    does not flip bits, and trimmed to the bounding box of the ink so the same
+    plate framed a few pixels off lands on the same grid. The hash records
+    where the strokes rise and fall along each row of a small grid, much finer
+    than the usual 8x8 dHash so that plates differing in a single character
+    stay apart. A lookup matches the nearest cached crop of the same shape
+    within max_distance differing bits. Entries expire after ttl_seconds and the least recently
+    used entry is evicted beyond max_size.
+    """
+
+    def __init__(self, max_size=512, ttl_seconds=60.0, hash_size=(64, 16), max_distance=32, min_step=48):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.hash_size = hash_size
+        self.max_distance = max_distance
+        self.min_step = min_step    # smaller gray-level steps on the grid count as flat
+
+        # (shape, hash) -> (stored_at, value), least recently used first
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'near_hits': 0, 'misses': 0, 'expired': 0, 'evicted': 0, 'total_us': 0.0}
+
+    def key(self, crop):
+        """(shape, hash) key of a crop; shape is its aspect ratio rounded to one decimal"""
+        gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+        _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        binary = self._trim(binary)
+
+        width, height = self.hash_size
+        small = cv2.resize(binary, (width + 1, height), interpolation=cv2.INTER_AREA).astype(np.int16)
+        steps = small[:, 1:] - small[:, :-1]
+        bits = np.concatenate([(steps > self.min_step).ravel(), (steps < -self.min_step).ravel()])
+        return round(crop.shape[1] / crop.shape[0], 1), np.packbits(bits).tobytes()
+
+    def _trim(self, binary):
+        # Ink is the minority color; a 3x3 median drops stray specks so they
+        # cannot widen the box
+        ink = (binary == 0) if binary.mean() > 127 else (binary > 0)
+        ink = cv2.medianBlur(ink.astype(np.uint8) * 255, 3) > 0
+        rows = np.flatnonzero(ink.any(axis=1))
+        cols = np.flatnonzero(ink.any(axis=0))
+        if len(rows) == 0:
+            return binary
+        return binary[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1]
+
+    def get(self, key, now=None):
+        """Cached value for key or its nearest match, or None on a miss"""
+        started = time.perf_counter()
+        now = time.monotonic() if now is None else now
+
+        with self.lock:
+            match = key if key in self.entries else self._nearest(key)
+            if match is not None and now - self.entries[match][0] > self.ttl_seconds:
+                del self.entries[match]
+                self.stats['expired'] += 1
+                match = None
+
+            if match is None:
+                self.stats['misses'] += 1
+                value = None
+            else:
+                self.entries.move_to_end(match)
+                self.stats['hits'] += 1
+                self.stats['near_hits'] += match != key
+                value = self.entries[match][1]
+
+            self.stats['total_us'] += (time.perf_counter() - started) * 1e6
+
+        return value
+
+    def _nearest(self, key):
+        shape, bits = key
+        candidates = [candidate for candidate in self.entries if candidate[0] == shape]
+        if not candidates:
+            return None
+
+        hashes = np.frombuffer(b''.join(candidate[1] for candidate in candidates), dtype=np.uint8)
+        hashes = hashes.reshape(len(candidates), len(bits))
+        distances = POPCOUNT[hashes ^ np.frombuffer(bits, dtype=np.uint8)].sum(axis=1)
+
+        best = int(distances.argmin())
+        return candidates[best] if distances[best] <= self.max_distance else None
+
+    def put(self, key, value, now=None):
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            self.entries[key] = (now, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.stats['evicted'] += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def get_stats(self):
+        """Hit, miss and eviction counters, current size and average lookup time"""
+        with self.lock:
+            stats = dict(self.stats, size=len(self.entries))
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = stats['hits'] / lookups if lookups else 0.0
+        stats['avg_lookup_us'] = stats['total_us'] / lookups if lookups else 0.0
+        return stats
+
+    def __len__(self):
+        return len(self.entries)
@@ -0,0 +1,151 @@
+import ast
+import os
+import cv2
+import numpy as np
+import onnxruntime as ort
+from onnxruntime.quantization import CalibrationDataReader, QuantType, quantize_dynamic, quantize_static
+
+from models.vehicle_detector import VehicleDetector
+
+def export_onnx(model_path, imgsz=640):
+    """Export a YOLO .pt model to ONNX next to it, once; returns the .onnx path"""
+    onnx_path = os.path.splitext(model_path)[0] + '.onnx'
+    if not os.path.exists(onnx_path):
+        from ultralytics import YOLO
+
+        # Dynamic axes so lanes can be batched
+        exported = YOLO(model_path).export(format='onnx', imgsz=imgsz, dynamic=True, simplify=True)
+        if os.path.abspath(exported) != os.path.abspath(onnx_path):
+            os.replace(exported, onnx_path)
+    return onnx_path
+
+def quantize_onnx(onnx_path, calibration_frames=None, imgsz=640):
+    """Write an INT8 copy of an ONNX model, once; returns its path
+
+    With calibration frames (a few hundred lane images) weights and
+    activations are quantized statically, which is what speeds up the
+    convolutions on CPU. Without them only the weights are quantized.
+    """
+    int8_path = os.path.splitext(onnx_path)[0] + '.int8.onnx'
+    if os.path.exists(int8_path):
+        return int8_path
+
+    if calibration_frames is None:
+        quantize_dynamic(onnx_path, int8_path, weight_type=QuantType.QUInt8)
+    else:
+        input_name = ort.InferenceSession(onnx_path, providers=['CPUExecutionProvider']).get_inputs()[0].name
+        reader = FrameCalibrationReader(input_name, calibration_frames, imgsz)
+        quantize_static(onnx_path, int8_path, reader, activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8)
+    return int8_path
+
+def letterbox(frame, size):
+    """Resize keeping aspect ratio and pad to size x size; returns (image, scale, (left, top))"""
+    height, width = frame.shape[:2]
+    scale = min(size / height, size / width)
+    resized_width, resized_height = round(width * scale), round(height * scale)
+    left, top = (size - resized_width) // 2, (size - resized_height) // 2
+
+    canvas = np.full((size, size, 3), 114, dtype=np.uint8)
+    canvas[top:top + resized_height, left:left + resized_width] = cv2.resize(
+        frame, (resized_width, resized_height), interpolation=cv2.INTER_LINEAR
+    )
+    return canvas, scale, (left, top)
+
+class FrameCalibrationReader(CalibrationDataReader):
+    """Feeds preprocessed frames to static INT8 calibration one at a time"""
+
+    def __init__(self, input_name, frames, imgsz=640):
+        self.input_name = input_name
+        self.frames = iter(frames)
+        self.imgsz = imgsz
+
+    def get_next(self):
+        frame = next(self.frames, None)
+        if frame is None:
+            return None
+        image, _, _ = letterbox(frame, self.imgsz)
+        return {self.input_name: cv2.dnn.blobFromImage(image, 1 / 255.0, swapRB=True)}
+
+class OnnxVehicleDetector(VehicleDetector):
+    """VehicleDetector that runs an exported YOLOv8 model on ONNX Runtime's CPU provider
+
+    Same detect/detect_batch/detect_lane output as the PyTorch path; the
+    model is exported (and optionally quantized to INT8) on first use and the
+    .onnx files are reused afterwards. Pre- and post-processing (letterbox,
+    confidence filter, per-class NMS) are done with NumPy and OpenCV.
+    """
+
+    def __init__(self, model_path='../ml_models/yolov8n.pt', quantize=False, calibration_frames=None,
+                 imgsz=640, conf_threshold=0.25, iou_threshold=0.45, threads=None):
+        self.imgsz = imgsz
+        self.conf_threshold = conf_threshold
+        self.iou_threshold = iou_threshold
+
+        onnx_path = model_path if model_path.endswith('.onnx') else export_onnx(model_path, imgsz)
+        if quantize:
+            onnx_path = quantize_onnx(onnx_path, calibration_frames, imgsz)
+        self.onnx_path = onnx_path
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(onnx_path, options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+
+        # Ultralytics stores the class table in the model metadata
+        names = self.session.get_modelmeta().custom_metadata_map['names']
+        self.set_class_names({int(cls): name for cls, name in ast.literal_eval(names).items()})
+
+    def detect_batch(self, frames, batch_size=8):
+        """Detect vehicles in several frames with batched ONNX Runtime runs"""
+        detections = []
+
+        for start in range(0, len(frames), batch_size):
+            batch = frames[start:start + batch_size]
+            letterboxed = [letterbox(frame, self.imgsz) for frame in batch]
+            blob = cv2.dnn.blobFromImages([image for image, _, _ in letterboxed], 1 / 255.0, swapRB=True)
+
+            # (batch, 4 + classes, anchors)
+            outputs = self.session.run(None, {self.input_name: blob})[0]
+            for frame, (_, scale, pad), output in zip(batch, letterboxed, outputs):
+                detections.append(self._postprocess(output, frame.shape, scale, pad))
+
+        return detections
+
+    def _postprocess(self, output, shape, scale, pad):
+        predictions = output.T
+        scores = predictions[:, 4:]
+        classes = scores.argmax(axis=1)
+        confidences = scores[np.arange(len(classes)), classes]
+
+        keep = (confidences >= self.conf_threshold) & np.isin(classes, self.vehicle_class_ids)
+        predictions, classes, confidences = predictions[keep], classes[keep], confidences[keep]
+        if not len(classes):
+            return []
+
+        # Centre/size in letterbox pixels -> corners in frame pixels
+        centers, sizes = predictions[:, :2], predictions[:, 2:4]
+        coords = np.hstack([centers - sizes / 2, centers + sizes / 2])
+        coords = (coords - [pad[0], pad[1], pad[0], pad[1]]) / scale
+        coords = np.clip(coords, 0, [shape[1], shape[0], shape[1], shape[0]]).astype(int)
+
+        kept = cv2.dnn.NMSBoxesBatched(
+            np.hstack([coords[:, :2], coords[:, 2:] - coords[:, :2]]).tolist(),
+            confidences.tolist(), classes.tolist(), self.conf_threshold, self.iou_threshold
+        )
+        kept = np.asarray(kept, dtype=int).reshape(-1)
+        kept = kept[np.argsort(-confidences[kept])]
+
+        centers = (coords[kept, :2] + coords[kept, 2:]) // 2
+        return [
+            {
+                'bbox': bbox,
+                'class': self.names[cls],
+                'confidence': confidence,
+                'center': center
+            }
+            for cls, bbox, confidence, center in zip(
+                classes[kept].tolist(), coords[kept].tolist(), confidences[kept].tolist(), centers.tolist()
+            )
+        ]
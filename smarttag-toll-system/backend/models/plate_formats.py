@@ -0,0 +1,71 @@
+import re
+import pandas as pd
+
+# National plate formats, checked in order; each pattern must match the whole plate
+PLATE_FORMATS = {
+    # DL01AB1234, DL01A1234, DL1CAB1234, DL011234
+    'standard': r'[A-Z]{2}[0-9]{1,2}[A-Z]{0,3}[0-9]{4}',
+    # 22BH1234AA
+    'bh_series': r'[0-9]{2}BH[0-9]{4}[A-Z]{1,2}',
+    # T0124KA1234AB: month/year of issue, state, serial
+    'temporary': r'T[0-9]{4}[A-Z]{2}[0-9]{4}[A-Z]{1,2}',
+    # 77CD123, 101UN12
+    'diplomatic': r'[0-9]{2,3}(?:CD|CC|UN)[0-9]{1,4}',
+    # Older numeric registrations accepted by the original validator
+    'legacy': r'[A-Z]{2}[0-9]{13}'
+}
+
+class PlateFormatEngine:
+    """All configured plate formats compiled into a single matcher"""
+
+    def __init__(self, formats=None):
+        self.formats = dict(formats or PLATE_FORMATS)
+
+        # One alternation of named groups; lastgroup names the format that matched
+        alternatives = '|'.join(f'(?P<{name}>{pattern})' for name, pattern in self.formats.items())
+        self.pattern = re.compile(f'^(?:{alternatives})$')
+        self.cleanup = re.compile(r'[^A-Za-z0-9]')
+
+    def canonicalize(self, text):
+        """Strip separators and uppercase"""
+        return self.cleanup.sub('', text or '').upper()
+
+    def match(self, plate_text):
+        """Return the name of the matching format, or None"""
+        if not plate_text:
+            return None
+        match = self.pattern.match(plate_text)
+        return match.lastgroup if match else None
+
+    def validate(self, text):
+        """Canonicalize one candidate string, returning (plate, format or None)"""
+        plate_text = self.canonicalize(text)
+        return plate_text, self.match(plate_text)
+
+    def validate_batch(self, texts):
+        """Canonicalize and classify many candidates in one vectorized pass
+
+        Returns a DataFrame with plate_text, plate_format and is_valid columns
+        aligned with the input.
+        """
+        plate_texts = (
+            pd.Series(list(texts), dtype=object)
+            .fillna('')
+            .astype(str)
+            .str.replace(self.cleanup.pattern, '', regex=True)
+            .str.upper()
+        )
+
+        # Each named group becomes a column; the first non-null one is the format
+        groups = plate_texts.str.extract(self.pattern)
+        matched = groups.notna()
+        is_valid = matched.any(axis=1)
+
+        # object dtype first, or where() would fill invalid rows with NaN
+        plate_formats = matched.idxmax(axis=1).astype(object).where(is_valid, None)
+
+        return pd.DataFrame({
+            'plate_text': plate_texts,
+            'plate_format': plate_formats,
+            'is_valid': is_valid
+        })
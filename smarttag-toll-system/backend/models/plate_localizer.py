@@ -0,0 +1,122 @@
+import threading
+import time
+import cv2
+import numpy as np
+
+class PlateLocalizer:
+    """Finds candidate plate rectangles inside a vehicle region with edge morphology
+
+    Plates show up as a dense band of vertical character strokes. A
+    black-hat/top-hat pass suppresses bodywork shading, a horizontal Sobel
+    picks out the strokes and a wide closing merges them into one blob per
+    plate; blobs with a plate-like aspect ratio become candidates. Only those
+    crops go to OCR instead of the whole vehicle box.
+    """
+
+    def __init__(self, min_aspect=1.5, max_aspect=10.0, min_width=0.1, max_width=0.9,
+                 max_candidates=2, margin=0.1, max_input_width=640):
+        # Aspect limits apply to the merged character band, which is wider
+        # relative to its height than the plate itself
+        self.min_aspect = min_aspect
+        self.max_aspect = max_aspect
+        self.min_width = min_width              # fraction of the vehicle width
+        self.max_width = max_width
+        self.max_candidates = max_candidates
+        self.margin = margin                    # horizontal padding, fraction of the candidate width
+        self.max_input_width = max_input_width  # larger regions are searched downscaled
+
+        self.char_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (13, 5))
+        self.close_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (17, 3))
+
+        self.stats_lock = threading.Lock()
+        self.stats = {
+            'vehicles': 0,
+            'localized': 0,
+            'candidates': 0,
+            'roi_pixels': 0,
+            'crop_pixels': 0,
+            'total_ms': 0.0
+        }
+
+    def localize(self, roi):
+        """Candidate plate boxes (x, y, w, h) in roi coordinates, most plate-like first"""
+        started = time.perf_counter()
+        height, width = roi.shape[:2]
+        boxes = []
+
+        if height >= 8 and width >= 16:
+            gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY) if roi.ndim == 3 else roi
+
+            scale = min(1.0, self.max_input_width / width)
+            if scale < 1.0:
+                gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+            boxes = [
+                self._pad(x / scale, y / scale, w / scale, h / scale, width, height)
+                for x, y, w, h in self._candidates(gray)
+            ]
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self.stats_lock:
+            self.stats['vehicles'] += 1
+            self.stats['localized'] += bool(boxes)
+            self.stats['candidates'] += len(boxes)
+            self.stats['roi_pixels'] += height * width
+            self.stats['crop_pixels'] += sum(w * h for _, _, w, h in boxes) if boxes else height * width
+            self.stats['total_ms'] += elapsed_ms
+
+        return boxes
+
+    def locate(self, frame, bbox):
+        """Candidate plate boxes [x, y, w, h] in frame coordinates for a vehicle bbox [x1, y1, x2, y2]"""
+        x1, y1, x2, y2 = bbox
+        return [[x1 + x, y1 + y, w, h] for x, y, w, h in self.localize(frame[y1:y2, x1:x2])]
+
+    def _candidates(self, gray):
+        height, width = gray.shape
+
+        # Character strokes of dark-on-light and light-on-dark plates
+        strokes = cv2.max(
+            cv2.morphologyEx(gray, cv2.MORPH_BLACKHAT, self.char_kernel),
+            cv2.morphologyEx(gray, cv2.MORPH_TOPHAT, self.char_kernel)
+        )
+        gradient = np.abs(cv2.Sobel(strokes, cv2.CV_32F, 1, 0, ksize=3))
+        gradient = cv2.normalize(gradient, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
+
+        # Merge the strokes of one plate into a single blob
+        gradient = cv2.GaussianBlur(gradient, (5, 5), 0)
+        gradient = cv2.morphologyEx(gradient, cv2.MORPH_CLOSE, self.close_kernel)
+        _, mask = cv2.threshold(gradient, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        mask = cv2.dilate(cv2.erode(mask, None, iterations=2), None, iterations=2)
+
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+        scored = []
+        for contour in contours:
+            x, y, w, h = cv2.boundingRect(contour)
+            if not (self.min_aspect <= w / h <= self.max_aspect):
+                continue
+            if not (self.min_width * width <= w <= self.max_width * width):
+                continue
+
+            # Dense blobs low in the vehicle are the likeliest plates
+            fill = cv2.contourArea(contour) / (w * h)
+            scored.append((fill * (0.5 + (y + h / 2) / height), (x, y, w, h)))
+
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [box for _, box in scored[:self.max_candidates]]
+
+    def _pad(self, x, y, w, h, width, height):
+        # Half the band height above and below brings back the plate border
+        dx, dy = w * self.margin, h * 0.5
+        x1, y1 = max(int(x - dx), 0), max(int(y - dy), 0)
+        x2, y2 = min(int(x + w + dx), width), min(int(y + h + dy), height)
+        return x1, y1, x2 - x1, y2 - y1
+
+    def get_stats(self):
+        """Candidate counts, share of vehicle pixels left for OCR and latency per vehicle"""
+        with self.stats_lock:
+            stats = dict(self.stats)
+        stats['pixel_ratio'] = stats['crop_pixels'] / stats['roi_pixels'] if stats['roi_pixels'] else 0.0
+        stats['avg_ms'] = stats['total_ms'] / stats['vehicles'] if stats['vehicles'] else 0.0
+        return stats
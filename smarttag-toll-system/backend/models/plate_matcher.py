@@ -0,0 +1,124 @@
+# Characters OCR commonly confuses on number plates, grouped by look-alike shape
+CONFUSABLE_GROUPS = ['0ODQ', '1IL', '8B', '5S', '2Z', '6G']
+
+# Substituting within a confusion group costs this much instead of a full edit
+CONFUSION_COST = 0.25
+
+CANONICAL_CHARS = {char: group[0] for group in CONFUSABLE_GROUPS for char in group}
+
+def normalize_plate(text):
+    """Map look-alike characters to one canonical character"""
+    return ''.join(CANONICAL_CHARS.get(char, char) for char in text)
+
+def within_one_edit(a, b):
+    """Linear-time check that two strings differ by at most one edit"""
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+
+    if len(a) == len(b):
+        return a[i + 1:] == b[i + 1:]
+    return a[i:] == b[i + 1:]
+
+def confusion_distance(a, b):
+    """Edit distance where confusable substitutions are cheap, used for scoring"""
+    previous = [float(j) for j in range(len(b) + 1)]
+    for i, char_a in enumerate(a, 1):
+        current = [float(i)]
+        for j, char_b in enumerate(b, 1):
+            if char_a == char_b:
+                substitution = 0.0
+            elif CANONICAL_CHARS.get(char_a, char_a) == CANONICAL_CHARS.get(char_b, char_b):
+                substitution = CONFUSION_COST
+            else:
+                substitution = 1.0
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + substitution
+            ))
+        previous = current
+    return previous[-1]
+
+def match_score(text, plate):
+    """Similarity in [0, 1] between an OCR reading and a registered plate"""
+    length = max(len(text), len(plate))
+    if length == 0:
+        return 0.0
+    return max(0.0, 1 - confusion_distance(text, plate) / length)
+
+class FuzzyPlateIndex:
+    """Confusion-normalized plate index for single-edit lookups in constant time"""
+
+    def __init__(self, plates=None):
+        # normalized key -> registered plates, so pure confusion slips are one probe
+        self.keys = {}
+
+        # (key length, half, half text) -> normalized keys. A single edit leaves
+        # one half of the key intact, so these buckets hold every candidate.
+        self.halves = {}
+
+        for plate in plates or []:
+            self.add(plate)
+
+    def _half_keys(self, key, length):
+        split = length // 2
+        return (length, 0, key[:split]), (length, 1, key[len(key) - (length - split):])
+
+    def add(self, plate):
+        """Insert a registered plate"""
+        key = normalize_plate(plate)
+
+        if key not in self.keys:
+            self.keys[key] = set()
+            for half_key in self._half_keys(key, len(key)):
+                self.halves.setdefault(half_key, set()).add(key)
+
+        self.keys[key].add(plate)
+
+    def remove(self, plate):
+        """Forget a registered plate"""
+        key = normalize_plate(plate)
+        plates = self.keys.get(key)
+        if plates is None:
+            return
+
+        plates.discard(plate)
+        if not plates:
+            del self.keys[key]
+            for half_key in self._half_keys(key, len(key)):
+                self.halves[half_key].discard(key)
+
+    def search(self, text):
+        """Return (plate, score) pairs at most one non-confusion edit away, best first"""
+        key = normalize_plate(text)
+
+        if key in self.keys:
+            candidates = set(self.keys[key])
+        else:
+            candidates = set()
+            for length in (len(key) - 1, len(key), len(key) + 1):
+                if length <= 0:
+                    continue
+                for half_key in self._half_keys(key, length):
+                    for candidate in self.halves.get(half_key, ()):
+                        if within_one_edit(key, candidate):
+                            candidates.update(self.keys[candidate])
+
+        matches = [(plate, match_score(text, plate)) for plate in candidates]
+        return sorted(matches, key=lambda match: match[1], reverse=True)
+
+    def best_match(self, text, min_score=0.0):
+        """Return the closest (plate, score), or (None, 0.0) below min_score"""
+        matches = self.search(text)
+        if matches and matches[0][1] >= min_score:
+            return matches[0]
+        return None, 0.0
+
+    def __len__(self):
+        return sum(len(plates) for plates in self.keys.values())
@@ -0,0 +1,129 @@
+import threading
+import time
+import cv2
+import numpy as np
+
+class BatchOCR:
+    """Recognizes many plate crops per call instead of one OCR call per vehicle
+
+    Wraps an easyocr.Reader (detection runs batched through readtext_batched)
+    or a PaddleOCR instance (text lines of every crop are recognized in one
+    batched recognizer call). Crops may come from one frame or several.
+    """
+
+    def __init__(self, engine, batch_size=16, cache=None):
+        self.engine = engine
+        self.batch_size = batch_size
+        self.is_easyocr = hasattr(engine, 'readtext_batched')
+
+        # Optional OCRCache; crops seen recently skip OCR entirely
+        self.cache = cache
+
+        self.stats_lock = threading.Lock()
+        self.stats = {'calls': 0, 'crops': 0, 'cached': 0, 'pixels': 0, 'lines': 0, 'total_seconds': 0.0}
+
+    def read_batch(self, crops):
+        """OCR every crop, returning one list of (text, confidence) lines per crop"""
+        if not crops:
+            return []
+
+        results = [None] * len(crops)
+        keys = None
+        if self.cache is not None:
+            keys = [self.cache.key(crop) for crop in crops]
+            results = [self.cache.get(key) for key in keys]
+
+        missing = [i for i, lines in enumerate(results) if lines is None]
+        if not missing:
+            with self.stats_lock:
+                self.stats['cached'] += len(crops)
+            return results
+
+        started = time.perf_counter()
+        misses = [crops[i] for i in missing]
+        if self.is_easyocr:
+            read = self._read_easyocr(misses)
+        else:
+            read = self._read_paddle(misses)
+        elapsed = time.perf_counter() - started
+
+        for i, lines in zip(missing, read):
+            results[i] = lines
+            if keys is not None:
+                self.cache.put(keys[i], lines)
+
+        with self.stats_lock:
+            self.stats['calls'] += 1
+            self.stats['crops'] += len(misses)
+            self.stats['cached'] += len(crops) - len(misses)
+            self.stats['pixels'] += sum(crop.shape[0] * crop.shape[1] for crop in misses)
+            self.stats['lines'] += sum(len(lines) for lines in read)
+            self.stats['total_seconds'] += elapsed
+
+        return results
+
+    def read_best(self, crops):
+        """Highest-confidence (text, confidence) line per crop, or None"""
+        return [max(lines, key=lambda line: line[1]) if lines else None for lines in self.read_batch(crops)]
+
+    def _read_easyocr(self, crops):
+        results = [None] * len(crops)
+
+        # readtext_batched needs equal-sized images; batching crops of similar
+        # size keeps the padding small
+        order = sorted(range(len(crops)), key=lambda i: crops[i].shape[0] * crops[i].shape[1])
+        for start in range(0, len(order), self.batch_size):
+            indices = order[start:start + self.batch_size]
+            batch = pad_to_common_size([crops[i] for i in indices])
+            for i, lines in zip(indices, self.engine.readtext_batched(batch, batch_size=len(batch))):
+                results[i] = [(text, float(confidence)) for _, text, confidence in lines]
+
+        return results
+
+    def _read_paddle(self, crops):
+        # Text detection runs per crop; every detected line is then recognized
+        # in one batched call (a nested list keeps PaddleOCR from splitting it)
+        owners, lines = [], []
+        for i, crop in enumerate(crops):
+            boxes = self.engine.ocr(crop, det=True, rec=False, cls=False)
+            for box in (boxes[0] or []) if boxes else []:
+                points = np.asarray(box, dtype=np.float32)
+                x, y, w, h = cv2.boundingRect(points)
+                line = crop[max(y, 0):y + h, max(x, 0):x + w]
+                if line.size:
+                    owners.append(i)
+                    lines.append(line)
+
+        results = [[] for _ in crops]
+        if lines:
+            recognized = self.engine.ocr([lines], det=False, cls=True)[0]
+            for i, (text, confidence) in zip(owners, recognized):
+                results[i].append((text, float(confidence)))
+
+        return results
+
+    def get_stats(self):
+        """Call counts, throughput in crops per second and average latency and size per OCR'd crop"""
+        with self.stats_lock:
+            stats = dict(self.stats)
+        stats['crops_per_second'] = stats['crops'] / stats['total_seconds'] if stats['total_seconds'] else 0.0
+        stats['ms_per_crop'] = stats['total_seconds'] * 1000 / stats['crops'] if stats['crops'] else 0.0
+        stats['pixels_per_crop'] = stats['pixels'] / stats['crops'] if stats['crops'] else 0.0
+        if self.cache is not None:
+            stats['cache'] = self.cache.get_stats()
+        return stats
+
+def pad_to_common_size(images):
+    """Pad images at the bottom and right to the largest height and width among them"""
+    color = any(image.ndim == 3 for image in images)
+    height = max(image.shape[0] for image in images)
+    width = max(image.shape[1] for image in images)
+
+    padded = []
+    for image in images:
+        if color and image.ndim == 2:
+            image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+        padded.append(cv2.copyMakeBorder(
+            image, 0, height - image.shape[0], 0, width - image.shape[1], cv2.BORDER_CONSTANT, value=0
+        ))
+    return padded
@@ -1,59 +1,75 @@
 from paddleocr import PaddleOCR
 import cv2
 import numpy as np
-import re
+
+from models.ocr_cache import OCRCache
+from models.plate_formats import PlateFormatEngine
+from models.plate_localizer import PlateLocalizer
+from models.plate_ocr import BatchOCR
 
 class PlateReader:
-    def __init__(self):
+    def __init__(self, plate_formats=None):
         self.ocr = PaddleOCR(use_angle_cls=True, lang='en')
-        self.plate_pattern = re.compile(r'^[A-Z]{2}[0-9]{2}[A-Z]{2}[0-9]{4}$|^[A-Z]{2}[0-9]{13}$')
+        self.batch_ocr = BatchOCR(self.ocr, cache=OCRCache())
+        self.localizer = PlateLocalizer()
+        self.plate_formats = PlateFormatEngine(plate_formats)
         
     def read_plates(self, frame, vehicles):
         """Read license plates from detected vehicles"""
-        plates = []
+        return self.read_plates_batch([(frame, vehicles)])[0]
+    
+    def read_plates_batch(self, frames):
+        """Read plates for several (frame, vehicles) pairs with one batched OCR pass
+        
+        Returns one plate list per frame, in input order.
+        """
+        crops, owners = [], []
+        
+        for index, (frame, vehicles) in enumerate(frames):
+            for vehicle in vehicles:
+                # Extract vehicle region
+                x1, y1, x2, y2 = vehicle['bbox']
+                vehicle_roi = frame[y1:y2, x1:x2]
+                
+                if vehicle_roi.size == 0:
+                    continue
+                
+                # OCR only the localized plate candidates, or the whole vehicle if none
+                candidates = self.localizer.locate(frame, vehicle['bbox']) or [[x1, y1, x2-x1, y2-y1]]
+                for x, y, w, h in candidates:
+                    crops.append(frame[y:y+h, x:x+w])
+                    owners.append((index, vehicle, [x, y, w, h]))
         
-        for vehicle in vehicles:
-            # Extract vehicle region
-            x1, y1, x2, y2 = vehicle['bbox']
-            vehicle_roi = frame[y1:y2, x1:x2]
-            
-            if vehicle_roi.size == 0:
-                continue
-            
-            # Perform OCR on vehicle region
-            result = self.ocr.ocr(vehicle_roi, cls=True)
-            
-            if result and result[0]:
-                for line in result[0]:
-                    text = line[1][0]
-                    confidence = line[1][1]
-                    
-                    # Clean and validate plate text
-                    cleaned_text = self.clean_plate_text(text)
-                    
-                    plates.append({
-                        'text': cleaned_text,
-                        'confidence': confidence,
-                        'bbox': [x1, y1, x2-x1, y2-y1],
-                        'vehicle_class': vehicle['class'],
-                        'is_valid': self.validate_plate(cleaned_text)
-                    })
+        # Recognize every plate region together, then map lines back
+        results = self.batch_ocr.read_batch(crops)
+        lines = [(owner, line) for owner, crop_lines in zip(owners, results) for line in crop_lines]
+        
+        # Clean and validate every OCR line in one call
+        validated = self.plate_formats.validate_batch(text for _, (text, _) in lines)
+        
+        plates = [[] for _ in frames]
+        for ((index, vehicle, bbox), (_, confidence)), plate_text, plate_format, is_valid in zip(
+            lines, validated['plate_text'], validated['plate_format'], validated['is_valid']
+        ):
+            plates[index].append({
+                'text': plate_text,
+                'confidence': confidence,
+                'bbox': bbox,
+                'vehicle_class': vehicle['class'],
+                'is_valid': bool(is_valid),
+                'plate_format': plate_format if is_valid else None
+            })
         
         return plates
     
     def clean_plate_text(self, text):
         """Clean and format license plate text"""
-        # Remove special characters and spaces
-        cleaned = re.sub(r'[^A-Za-z0-9]', '', text)
-        return cleaned.upper()
+        return self.plate_formats.canonicalize(text)
     
     def validate_plate(self, plate_text):
         """Validate license plate format"""
-        if not plate_text:
-            return False
-        
-        # Check if plate matches Indian format
-        return bool(self.plate_pattern.match(plate_text))
+        # Check if plate matches any configured national format
+        return self.plate_formats.match(plate_text) is not None
     
     def preprocess_plate(self, plate_image):
         """Preprocess plate image for better OCR"""
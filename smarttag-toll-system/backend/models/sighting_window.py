@@ -0,0 +1,72 @@
+from collections import OrderedDict
+import threading
+import time
+
+class SightingWindow:
+    """Per-lane sliding window of recent plate sightings with bounded memory"""
+
+    NEW = 'NEW'
+    REPEAT = 'REPEAT'
+    DUPLICATE = 'DUPLICATE'
+
+    def __init__(self, window_seconds=30.0, max_plates_per_lane=5000):
+        self.window_seconds = window_seconds
+        self.max_plates_per_lane = max_plates_per_lane
+
+        # lane_id -> OrderedDict(plate -> last_seen), oldest sighting first
+        self.lanes = {}
+        self.lock = threading.Lock()
+
+    def observe(self, plate_number, lane_id='default', seen_at=None):
+        """Record a sighting and classify it as NEW, REPEAT or DUPLICATE
+
+        REPEAT means the same lane saw the plate within the window, i.e. the
+        vehicle is still waiting at the barrier. DUPLICATE means another lane
+        saw it within the window, which a single physical tag cannot do. Only
+        the first sighting in a lane can be DUPLICATE; later ones are REPEAT,
+        so each crossing is flagged once.
+        """
+        if seen_at is None:
+            seen_at = time.time()
+
+        with self.lock:
+            lane = self.lanes.setdefault(lane_id, OrderedDict())
+            self._expire(lane, seen_at)
+
+            status = self.NEW
+            if plate_number in lane:
+                status = self.REPEAT
+
+            idle_lanes = []
+            for other_id, other_lane in self.lanes.items():
+                if other_id == lane_id:
+                    continue
+                # Lane ids come from clients; drop lanes with nothing left in the window
+                if not other_lane or seen_at - next(reversed(other_lane.values())) > self.window_seconds:
+                    idle_lanes.append(other_id)
+                    continue
+                last_seen = other_lane.get(plate_number)
+                if status == self.NEW and last_seen is not None and seen_at - last_seen <= self.window_seconds:
+                    status = self.DUPLICATE
+
+            for other_id in idle_lanes:
+                del self.lanes[other_id]
+
+            lane[plate_number] = seen_at
+            lane.move_to_end(plate_number)
+
+            # Hard cap so a burst of traffic cannot grow the window unbounded
+            while len(lane) > self.max_plates_per_lane:
+                lane.popitem(last=False)
+
+        return status
+
+    def _expire(self, lane, now):
+        while lane:
+            plate_number, last_seen = next(iter(lane.items()))
+            if now - last_seen <= self.window_seconds:
+                break
+            lane.popitem(last=False)
+
+    def __len__(self):
+        return sum(len(lane) for lane in self.lanes.values())
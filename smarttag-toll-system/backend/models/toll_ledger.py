@@ -0,0 +1,172 @@
+from datetime import datetime
+import atexit
+import threading
+
+# Toll charged per passage, by vehicle class
+TOLL_RATES = {
+    'car': 95.0,
+    'motorcycle': 0.0,
+    'bicycle': 0.0,
+    'bus': 320.0,
+    'truck': 320.0
+}
+
+# Charged for classes missing from the rate table
+DEFAULT_TOLL = 200.0
+
+class TollLedger:
+    """In-memory balance table that debits tolls atomically and persists them write-behind
+
+    Balances are seeded lazily from the registry the first time a plate is
+    charged. Debits update memory under a per-plate lock stripe and are queued;
+    a background thread writes queued debits and their transactions to the
+    database in one commit per batch instead of one commit per vehicle.
+    Without a database the ledger only keeps balances in memory.
+    """
+
+    CHARGED = 'CHARGED'
+    INSUFFICIENT_BALANCE = 'INSUFFICIENT_BALANCE'
+    UNREGISTERED = 'UNREGISTERED'
+
+    def __init__(self, registry, db=None, toll_rates=None, batch_size=500, flush_interval=1.0, lock_stripes=64):
+        self.registry = registry
+        self.db = db
+        self.toll_rates = dict(TOLL_RATES, **(toll_rates or {}))
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        # plate -> live balance, and the registry record it was seeded from
+        self.balances = {}
+        self.sources = {}
+
+        # Lanes charging different plates rarely contend on the same stripe
+        self.locks = [threading.Lock() for _ in range(lock_stripes)]
+
+        # Debits not yet written: plate -> amount, plus their transaction rows
+        self.pending_debits = {}
+        self.pending_transactions = []
+        self.pending_lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.flush_requested = threading.Event()
+
+        self.stop_event = None
+        self.flush_thread = None
+
+    def toll_for(self, vehicle_class):
+        """Toll amount for a vehicle class"""
+        return self.toll_rates.get(vehicle_class, DEFAULT_TOLL)
+
+    def _lock_for(self, plate_number):
+        return self.locks[hash(plate_number) % len(self.locks)]
+
+    def _current_balance(self, plate_number, record):
+        # Re-seed when the registry delivered a newer record (e.g. a top-up)
+        # and no debits for this plate are still waiting to be written
+        if (plate_number not in self.balances or
+                (record != self.sources.get(plate_number) and plate_number not in self.pending_debits)):
+            self.balances[plate_number] = record.balance
+            self.sources[plate_number] = record
+        return self.balances[plate_number]
+
+    def balance(self, plate_number):
+        """Live balance including unflushed debits, or None if unregistered"""
+        record = self.registry.lookup(plate_number)
+        if record is None:
+            return None
+        with self._lock_for(plate_number):
+            return self._current_balance(plate_number, record)
+
+    def debit(self, plate_number, vehicle_class, transaction=None):
+        """Charge the class toll for one passage; all-or-nothing per plate"""
+        record = self.registry.lookup(plate_number)
+        if record is None:
+            return {'status': self.UNREGISTERED, 'charged': False, 'amount': 0.0, 'balance': None}
+
+        # Tolls follow the registered class; a mismatch is a fraud check concern
+        amount = self.toll_for(record.vehicle_class or vehicle_class)
+
+        with self._lock_for(plate_number):
+            balance = self._current_balance(plate_number, record)
+            if balance < amount:
+                return {'status': self.INSUFFICIENT_BALANCE, 'charged': False, 'amount': amount, 'balance': balance}
+
+            balance -= amount
+            self.balances[plate_number] = balance
+            if self.db is None:
+                return {'status': self.CHARGED, 'charged': True, 'amount': amount, 'balance': balance}
+
+            with self.pending_lock:
+                self.pending_debits[plate_number] = self.pending_debits.get(plate_number, 0.0) + amount
+                self.pending_transactions.append(dict(
+                    transaction or {},
+                    timestamp=(transaction or {}).get('timestamp', datetime.now().isoformat()),
+                    plate_number=plate_number,
+                    vehicle_class=vehicle_class,
+                    toll_amount=amount
+                ))
+                if len(self.pending_transactions) >= self.batch_size:
+                    self.flush_requested.set()
+
+        return {'status': self.CHARGED, 'charged': True, 'amount': amount, 'balance': balance}
+
+    def flush(self):
+        """Write all queued debits in one database commit, returning rows written"""
+        with self.flush_lock:
+            with self.pending_lock:
+                debits, self.pending_debits = self.pending_debits, {}
+                transactions, self.pending_transactions = self.pending_transactions, []
+
+            if not transactions:
+                return 0
+
+            if self.db is not None:
+                try:
+                    self.db.apply_toll_debits(debits, transactions)
+                except Exception:
+                    # Put the batch back so nothing is lost; retried on the next flush
+                    with self.pending_lock:
+                        for plate_number, amount in debits.items():
+                            self.pending_debits[plate_number] = self.pending_debits.get(plate_number, 0.0) + amount
+                        self.pending_transactions[:0] = transactions
+                    raise
+
+            # Records fetched before this write are older than our balances
+            for plate_number in debits:
+                with self._lock_for(plate_number):
+                    record = self.registry.lookup(plate_number)
+                    if record is not None and plate_number not in self.pending_debits:
+                        self.sources[plate_number] = record
+
+            return len(transactions)
+
+    def start(self):
+        """Start the write-behind thread"""
+        if self.flush_thread is not None:
+            return
+
+        self.stop_event = threading.Event()
+        stop = self.stop_event
+
+        def run():
+            while not stop.is_set():
+                self.flush_requested.wait(self.flush_interval)
+                self.flush_requested.clear()
+                try:
+                    self.flush()
+                except Exception as e:
+                    print(f"Toll ledger flush error: {e}")
+
+        self.flush_thread = threading.Thread(target=run, name='toll-ledger', daemon=True)
+        self.flush_thread.start()
+
+        # Registered after the database's own close, so it runs before it
+        atexit.register(self.close)
+
+    def close(self):
+        """Stop the write-behind thread and flush what is left"""
+        if self.flush_thread is not None:
+            self.stop_event.set()
+            self.flush_requested.set()
+            self.flush_thread.join()
+            self.flush_thread = None
+        self.flush()
@@ -1,11 +1,17 @@
 import cv2
 import numpy as np
-from ultralytics import YOLO
-import torch
 
 class VehicleDetector:
     def __init__(self, model_path='../ml_models/yolov8n.pt'):
+        # Imported here so the ONNX Runtime backend never loads PyTorch
+        from ultralytics import YOLO
+        
         self.model = YOLO(model_path)
+        self.set_class_names(self.model.names)
+        
+    def set_class_names(self, names):
+        """Use the model's class id -> name table and find the vehicle classes in it"""
+        self.names = names
         self.vehicle_classes = ['car', 'motorcycle', 'bus', 'truck', 'bicycle']
         self.colors = {
             'car': (0, 255, 0),
@@ -15,33 +21,64 @@ class VehicleDetector:
             'bicycle': (255, 0, 255)
         }
         
+        # Model class ids of the vehicle classes, for filtering boxes in bulk
+        self.vehicle_class_ids = np.array(
+            [cls for cls, name in names.items() if name in self.vehicle_classes], dtype=int
+        )
+        
     def detect(self, frame):
         """Detect vehicles in frame"""
-        results = self.model(frame, stream=True)
-        vehicles = []
+        return self.detect_batch([frame])[0]
+    
+    def detect_batch(self, frames, batch_size=8):
+        """Detect vehicles in several frames (e.g. one per lane) with batched forward passes
+        
+        Returns one vehicle list per frame, in input order.
+        """
+        detections = []
         
-        for r in results:
-            boxes = r.boxes
-            for box in boxes:
-                # Get class name
-                cls = int(box.cls[0])
-                class_name = self.model.names[cls]
+        for start in range(0, len(frames), batch_size):
+            results = self.model(list(frames[start:start + batch_size]), verbose=False)
+            
+            for r in results:
+                # Pull every box out as arrays at once instead of per box objects
+                boxes = r.boxes
+                classes = boxes.cls.cpu().numpy().astype(int)
+                coords = boxes.xyxy.cpu().numpy().astype(int)
+                confidences = boxes.conf.cpu().numpy()
+                
+                # Keep vehicle classes only
+                keep = np.isin(classes, self.vehicle_class_ids)
+                classes, coords, confidences = classes[keep], coords[keep], confidences[keep]
+                centers = (coords[:, :2] + coords[:, 2:]) // 2
                 
-                # Check if detected object is a vehicle
-                if class_name in self.vehicle_classes:
-                    x1, y1, x2, y2 = box.xyxy[0]
-                    x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
-                    
-                    confidence = float(box.conf[0])
-                    
-                    vehicles.append({
-                        'bbox': [x1, y1, x2, y2],
-                        'class': class_name,
+                detections.append([
+                    {
+                        'bbox': bbox,
+                        'class': self.names[cls],
                         'confidence': confidence,
-                        'center': [(x1 + x2) // 2, (y1 + y2) // 2]
-                    })
+                        'center': center
+                    }
+                    for cls, bbox, confidence, center in zip(
+                        classes.tolist(), coords.tolist(), confidences.tolist(), centers.tolist()
+                    )
+                ])
+        
+        return detections
+    
+    def detect_lane(self, frame, view):
+        """Detect vehicles inside a LaneView's region, in full-frame coordinates"""
+        def detect_region(region, mask, scale):
+            vehicles = self.detect(region)
+            # Keep boxes centred inside the lane polygon
+            if mask is not None:
+                vehicles = [
+                    vehicle for vehicle in vehicles
+                    if mask[min(vehicle['center'][1], mask.shape[0] - 1), min(vehicle['center'][0], mask.shape[1] - 1)]
+                ]
+            return sorted(vehicles, key=lambda vehicle: (vehicle['bbox'][2] - vehicle['bbox'][0]) * (vehicle['bbox'][3] - vehicle['bbox'][1]), reverse=True)
         
-        return vehicles
+        return view.detect(frame, detect_region)
     
     def annotate_frame(self, frame, vehicles, plates, fraud_results):
         """Annotate frame with detections"""
@@ -0,0 +1,273 @@
+from collections import namedtuple
+import threading
+import numpy as np
+import pandas as pd
+
+from models.plate_matcher import FuzzyPlateIndex
+
+# One compact, immutable record per registered FASTag vehicle
+VehicleRecord = namedtuple('VehicleRecord', [
+    'plate_number',
+    'owner_name',
+    'vehicle_class',
+    'balance',
+    'blacklisted',
+    'toll_pass',
+    'registration_date'
+])
+
+# Column dtypes for the registry's columnar copy
+COLUMN_DTYPES = {
+    'plate_number': object,
+    'owner_name': object,
+    'vehicle_class': object,
+    'balance': np.float64,
+    'blacklisted': bool,
+    'toll_pass': object,
+    'registration_date': object
+}
+
+# Batches up to this size are joined record by record through the dict index
+SMALL_BATCH = 32
+
+class VehicleRegistry:
+    """Plate-indexed FASTag registry shared by all fraud and verification paths"""
+
+    def __init__(self, vehicles=None):
+        # plate_number -> VehicleRecord, so every lookup is a single hash probe
+        self.index = {}
+
+        # Columnar copy for vectorized joins: plate -> row position, plus one
+        # array per field. _put and remove patch single rows in place, removals
+        # by moving the last row into the gap, and arrays grow by doubling.
+        self._positions = {}
+        self._columns = {field: np.empty(16, dtype=dtype) for field, dtype in COLUMN_DTYPES.items()}
+        self._size = 0
+
+        # Fuzzy index for OCR-tolerant matching, kept in step with the index by
+        # _put and remove so no lookup ever pays for a full build
+        self._fuzzy = FuzzyPlateIndex()
+
+        # Highest (updated_at, plate_number) applied from the database, for incremental refresh
+        self.watermark = None
+        self.watermark_plate = None
+        self._refresh_stop = None
+
+        # Serializes writers (refresh thread) and batch reads of the columns; lookups stay lock-free
+        self.lock = threading.RLock()
+
+        for vehicle_data in vehicles or []:
+            self.add(vehicle_data)
+
+    @classmethod
+    def from_dataframe(cls, df):
+        """Build registry from a DataFrame of vehicle rows"""
+        return cls(df.to_dict('records'))
+
+    @classmethod
+    def from_database(cls, db, chunk_size=5000):
+        """Build registry by streaming the vehicles table in chunks"""
+        registry = cls()
+        registry.refresh_from_database(db, chunk_size, full=True)
+        return registry
+
+    def refresh_from_database(self, db, chunk_size=5000, full=False):
+        """Apply vehicle rows changed since the watermark, returning how many were applied"""
+        since = None if full or self.watermark is None else (self.watermark, self.watermark_plate)
+        applied = 0
+
+        for chunk in db.iter_vehicles(since=since, chunk_size=chunk_size):
+            records = [self._record(vehicle_data) for vehicle_data in chunk]
+
+            # One lock hold per chunk, so readers never see a half-applied watermark
+            with self.lock:
+                for vehicle_data, record in zip(chunk, records):
+                    self._put(record)
+                    updated_at = vehicle_data.get('updated_at')
+                    if updated_at and (self.watermark is None or
+                                       (updated_at, record.plate_number) > (self.watermark, self.watermark_plate)):
+                        self.watermark, self.watermark_plate = updated_at, record.plate_number
+            applied += len(chunk)
+
+        return applied
+
+    def start_auto_refresh(self, db, interval=2.0):
+        """Poll the database for changed vehicles in a background thread"""
+        if self._refresh_stop is not None:
+            return
+
+        self._refresh_stop = threading.Event()
+        stop = self._refresh_stop
+
+        def poll():
+            while not stop.wait(interval):
+                try:
+                    self.refresh_from_database(db)
+                except Exception as e:
+                    print(f"Registry refresh error: {e}")
+
+        threading.Thread(target=poll, name='registry-refresh', daemon=True).start()
+
+    def stop_auto_refresh(self):
+        """Stop the background refresh thread"""
+        if self._refresh_stop is not None:
+            self._refresh_stop.set()
+            self._refresh_stop = None
+
+    def add(self, vehicle_data):
+        """Insert or replace a vehicle from a dict of column values"""
+        record = self._record(vehicle_data)
+        with self.lock:
+            self._put(record)
+        return record
+
+    def _record(self, vehicle_data):
+        return VehicleRecord(
+            plate_number=vehicle_data['plate_number'],
+            owner_name=vehicle_data.get('owner_name'),
+            vehicle_class=vehicle_data['vehicle_class'],
+            balance=float(vehicle_data.get('balance', 0)),
+            blacklisted=bool(vehicle_data.get('blacklisted', False)),
+            toll_pass=vehicle_data.get('toll_pass'),
+            registration_date=vehicle_data.get('registration_date')
+        )
+
+    def _put(self, record):
+        # Caller holds the lock; unchanged rows leave the cached structures alone
+        previous = self.index.get(record.plate_number)
+        if previous == record:
+            return
+
+        self.index[record.plate_number] = record
+        if previous is None:
+            self._fuzzy.add(record.plate_number)
+            self._positions[record.plate_number] = self._append_row()
+
+        position = self._positions[record.plate_number]
+        for field, value in zip(VehicleRecord._fields, record):
+            self._columns[field][position] = value
+
+    def _append_row(self):
+        # Caller holds the lock
+        capacity = len(self._columns['plate_number'])
+        if self._size == capacity:
+            for field, array in self._columns.items():
+                grown = np.empty(capacity * 2, dtype=array.dtype)
+                grown[:capacity] = array
+                self._columns[field] = grown
+
+        self._size += 1
+        return self._size - 1
+
+    def remove(self, plate_number):
+        """Remove a vehicle, returning its record if it was registered"""
+        with self.lock:
+            record = self.index.pop(plate_number, None)
+            if record is None:
+                return None
+
+            self._fuzzy.remove(plate_number)
+
+            # Move the last row into the gap so the columns stay dense
+            position = self._positions.pop(plate_number)
+            last = self._size - 1
+            if position != last:
+                moved = self._columns['plate_number'][last]
+                for array in self._columns.values():
+                    array[position] = array[last]
+                self._positions[moved] = position
+            for array in self._columns.values():
+                if array.dtype == object:
+                    array[last] = None
+            self._size = last
+
+            return record
+
+    def lookup(self, plate_number):
+        """Return the VehicleRecord for a plate, or None if unregistered"""
+        return self.index.get(plate_number)
+
+    def match(self, plate_text, min_score=0.0):
+        """Return (record, score) for the nearest registered plate, exact hits score 1.0"""
+        record = self.index.get(plate_text)
+        if record is not None:
+            return record, 1.0
+
+        # Held only for the probe, so the refresh thread cannot resize a bucket mid-search
+        with self.lock:
+            plate_number, score = self._fuzzy.best_match(plate_text, min_score)
+
+        if plate_number is None:
+            return None, 0.0
+        return self.index[plate_number], score
+
+    def contains_batch(self, plate_numbers):
+        """Vectorized membership test for an array of plates"""
+        index = self.index
+        plates = np.asarray(plate_numbers, dtype=object).tolist()
+        return np.fromiter((plate in index for plate in plates), dtype=bool, count=len(plates))
+
+    def lookup_batch(self, plate_numbers):
+        """Join an array of plates against the registry in one vectorized pass"""
+        plate_numbers = np.asarray(plate_numbers, dtype=object)
+        if len(plate_numbers) <= SMALL_BATCH:
+            return self._lookup_records(plate_numbers)
+
+        # Gathered under the lock, since a removal can move a row between the
+        # position probe and the read
+        with self.lock:
+            get = self._positions.get
+            positions = np.fromiter((get(plate, -1) for plate in plate_numbers.tolist()),
+                                    dtype=np.intp, count=len(plate_numbers))
+            registered = positions >= 0
+
+            # Unregistered rows read position 0 and are masked out below
+            safe_positions = np.where(registered, positions, 0)
+
+            result = {'plate_number': plate_numbers, 'registered': registered}
+            for field in ('owner_name', 'vehicle_class', 'toll_pass'):
+                result[field] = np.where(registered, self._columns[field][safe_positions], None)
+            result['balance'] = np.where(registered, self._columns['balance'][safe_positions], np.nan)
+            result['blacklisted'] = registered & self._columns['blacklisted'][safe_positions]
+
+        return pd.DataFrame(result)
+
+    def _lookup_records(self, plate_numbers):
+        # A few dict probes beat taking the lock and gathering from the columns
+        records = [self.index.get(plate) for plate in plate_numbers.tolist()]
+        registered = np.array([record is not None for record in records], dtype=bool)
+
+        result = {'plate_number': plate_numbers, 'registered': registered}
+        for field in ('owner_name', 'vehicle_class', 'toll_pass'):
+            result[field] = np.array(
+                [getattr(record, field) if record is not None else None for record in records], dtype=object
+            )
+        result['balance'] = np.array(
+            [record.balance if record is not None else np.nan for record in records], dtype=np.float64
+        )
+        result['blacklisted'] = np.array(
+            [record is not None and record.blacklisted for record in records], dtype=bool
+        )
+
+        return pd.DataFrame(result)
+
+    def columns(self):
+        """Return a plate-indexed DataFrame copy of the columnar registry"""
+        with self.lock:
+            columns = {field: array[:self._size].copy() for field, array in self._columns.items()}
+        return pd.DataFrame(columns, columns=VehicleRecord._fields).set_index('plate_number', drop=False)
+
+    def to_dataframe(self):
+        """Export registry contents as a DataFrame"""
+        with self.lock:
+            records = list(self.index.values())
+        return pd.DataFrame(records, columns=VehicleRecord._fields)
+
+    def __contains__(self, plate_number):
+        return plate_number in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def __iter__(self):
+        return iter(self.index.values())
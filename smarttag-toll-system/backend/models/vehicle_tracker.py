@@ -0,0 +1,183 @@
+from datetime import datetime
+import itertools
+import threading
+import numpy as np
+
+class Track:
+    """One vehicle followed across frames, with its best plate reading and last verdict"""
+
+    def __init__(self, track_id, bbox):
+        self.track_id = track_id
+        self.bbox = np.asarray(bbox, dtype=np.float64)
+        self.velocity = np.zeros(4)
+        self.hits = 1
+        self.misses = 0
+        self.vehicle = None         # latest detection
+
+        self.plate = None           # best reading so far, bbox relative to the vehicle
+        self.ocr_attempts = 0
+        self.fraud_info = None      # verdict, given once the reading has settled
+
+    def predict(self):
+        """Expected bbox in the next frame under constant velocity"""
+        return self.bbox + self.velocity
+
+    def update(self, bbox):
+        bbox = np.asarray(bbox, dtype=np.float64)
+        # Smoothed per-corner velocity; detections are noisy frame to frame
+        self.velocity = 0.5 * self.velocity + 0.5 * (bbox - self.bbox)
+        self.bbox = bbox
+        self.hits += 1
+        self.misses = 0
+
+    def observe_plate(self, plate):
+        """Keep plate if it beats the best reading so far; returns True if it did"""
+        self.ocr_attempts += 1
+        if plate is None or (self.plate is not None and plate['confidence'] <= self.plate['confidence']):
+            return False
+
+        x1, y1 = int(self.bbox[0]), int(self.bbox[1])
+        x, y, w, h = plate['bbox']
+        self.plate = dict(plate, bbox=[x - x1, y - y1, w, h])
+        return True
+
+    def plate_for(self, vehicle):
+        """Best plate reading placed on the vehicle's current bbox, or None"""
+        if self.plate is None:
+            return None
+        x, y, w, h = self.plate['bbox']
+        return dict(self.plate, bbox=[vehicle['bbox'][0] + x, vehicle['bbox'][1] + y, w, h])
+
+    def result_for(self, vehicle):
+        """Verdict moved to the vehicle's current position, or a placeholder until there is one
+
+        Reported as a repeat so it is neither charged nor recorded again.
+        """
+        if self.fraud_info is None:
+            return {
+                'vehicle_class': vehicle['class'],
+                'bbox': vehicle['bbox'],
+                'location': (vehicle['bbox'][0], vehicle['bbox'][1]),
+                'is_fraud': False,
+                'fraud_type': None,
+                'confidence': 0,
+                'timestamp': datetime.now().isoformat(),
+                'is_repeat': True,
+                'is_pending': True,
+                'fraud_flags': [],
+                'plate_number': self.plate['text'] if self.plate is not None else None,
+                'track_id': self.track_id
+            }
+
+        return dict(
+            self.fraud_info,
+            bbox=vehicle['bbox'],
+            location=(vehicle['bbox'][0], vehicle['bbox'][1]),
+            is_repeat=True,
+            track_id=self.track_id
+        )
+
+class VehicleTracker:
+    """SORT-style IoU tracker that assigns stable track ids to per-frame detections
+
+    Each track's bbox is extrapolated with a smoothed velocity and matched to
+    the new detections greedily by IoU, best overlap first. A track that goes
+    unmatched for more than max_age frames is dropped. Callers use needs_ocr()
+    to OCR a vehicle until its plate reading is confident or max_ocr_attempts
+    run out, then needs_verdict() to judge it exactly once. Tracks dropped
+    with a plate but no verdict are handed out by pop_departed().
+    """
+
+    def __init__(self, iou_threshold=0.3, max_age=5, min_plate_confidence=0.6, max_ocr_attempts=10):
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age
+        self.min_plate_confidence = min_plate_confidence
+        self.max_ocr_attempts = max_ocr_attempts
+
+        self.tracks = []
+        self.departed = []
+        self.next_id = itertools.count(1)
+        self.lock = threading.Lock()
+        self.stats = {'frames': 0, 'detections': 0, 'tracks_started': 0, 'ocr_needed': 0}
+
+    def update(self, vehicles):
+        """Match this frame's vehicles to tracks, returning the track of each vehicle
+
+        Sets vehicle['track_id'] on every vehicle.
+        """
+        with self.lock:
+            boxes = np.array([vehicle['bbox'] for vehicle in vehicles], dtype=np.float64).reshape(-1, 4)
+            predicted = np.array([track.predict() for track in self.tracks]).reshape(-1, 4)
+            overlaps = iou_matrix(predicted, boxes)
+
+            assigned = [None] * len(vehicles)
+            matched_tracks = set()
+            for t, v in zip(*np.unravel_index(np.argsort(-overlaps, axis=None), overlaps.shape)):
+                if overlaps[t, v] < self.iou_threshold:
+                    break
+                if t in matched_tracks or assigned[v] is not None:
+                    continue
+                matched_tracks.add(t)
+                assigned[v] = self.tracks[t]
+                self.tracks[t].update(boxes[v])
+
+            for t, track in enumerate(self.tracks):
+                if t not in matched_tracks:
+                    track.misses += 1
+
+            for v, vehicle in enumerate(vehicles):
+                if assigned[v] is None:
+                    assigned[v] = Track(next(self.next_id), boxes[v])
+                    self.tracks.append(assigned[v])
+                    self.stats['tracks_started'] += 1
+                assigned[v].vehicle = vehicle
+                vehicle['track_id'] = assigned[v].track_id
+
+            self.departed.extend(
+                track for track in self.tracks
+                if track.misses > self.max_age and track.fraud_info is None and track.plate is not None
+            )
+            self.tracks = [track for track in self.tracks if track.misses <= self.max_age]
+
+            self.stats['frames'] += 1
+            self.stats['detections'] += len(vehicles)
+            self.stats['ocr_needed'] += sum(self.needs_ocr(track) for track in assigned)
+
+        return assigned
+
+    def needs_ocr(self, track):
+        """True while a track's plate reading is missing or weak and attempts remain"""
+        if track.ocr_attempts >= self.max_ocr_attempts:
+            return False
+        return track.plate is None or track.plate['confidence'] < self.min_plate_confidence
+
+    def needs_verdict(self, track):
+        """True once a track's reading has settled and it has not been judged yet"""
+        return track.fraud_info is None and not self.needs_ocr(track)
+
+    def pop_departed(self):
+        """Tracks that left with a plate reading but no verdict, since the last call"""
+        with self.lock:
+            departed, self.departed = self.departed, []
+        return departed
+
+    def get_stats(self):
+        """Frame and detection counts and the share of detections that skipped OCR"""
+        with self.lock:
+            stats = dict(self.stats, active_tracks=len(self.tracks))
+        detections = stats['detections']
+        stats['ocr_skip_ratio'] = 1 - stats['ocr_needed'] / detections if detections else 0.0
+        return stats
+
+def iou_matrix(a, b):
+    """Pairwise IoU of (n, 4) and (m, 4) arrays of [x1, y1, x2, y2] boxes"""
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - intersection
+    return np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
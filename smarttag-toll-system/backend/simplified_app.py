@@ -1,34 +1,79 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, request, jsonify, send_file
 from flask_cors import CORS
 from flask_socketio import SocketIO, emit
 import cv2
 import numpy as np
 import base64
+import json
 from datetime import datetime
 import os
 import easyocr
 import pandas as pd
 import random
-import re
+
+from database.database import DatabaseManager
+from models.fraud_rules import FraudRuleEngine
+from models.lane_view import LaneView, load_lane_views
+from models.motion_gate import MotionGate
+from models.ocr_cache import OCRCache
+from models.plate_formats import PlateFormatEngine
+from models.plate_localizer import PlateLocalizer
+from models.plate_ocr import BatchOCR
+from models.sighting_window import SightingWindow
+from models.toll_ledger import TollLedger
+from models.vehicle_tracker import VehicleTracker
+from models.vehicle_registry import VehicleRegistry
 
 app = Flask(__name__)
 CORS(app)
 socketio = SocketIO(app, cors_allowed_origins="*")
 
+# Lane ids the HTTP and stream endpoints use when a client names none
+DEFAULT_LANES = ('http', 'default')
+
 # Initialize EasyOCR
 reader = easyocr.Reader(['en'])
 
 # Simulated database
 class SmartTagSystem:
-    def __init__(self):
+    def __init__(self, db=None, lane_views=None):
         self.vehicle_classes = ['car', 'motorcycle', 'bus', 'truck', 'bicycle']
         self.fraud_types = {
             'CLASS_MISMATCH': 'Vehicle Class Mismatch',
             'UNREGISTERED': 'Unregistered Vehicle',
-            'INVALID_PLATE': 'Invalid License Plate'
+            'INVALID_PLATE': 'Invalid License Plate',
+            'DUPLICATE': 'Duplicate Entry'
         }
-        self.registered_vehicles = self.create_sample_database()
-        
+        self.db = db
+        # Per-camera lane polygons and processing resolution; unconfigured
+        # lanes are processed in full and limited to 5 vehicles
+        self.lane_views = lane_views or {}
+        self.default_view = LaneView(max_vehicles=5)
+        self.registry = self.load_registry()
+        self.sightings = SightingWindow(window_seconds=30.0)
+        self.plate_formats = PlateFormatEngine()
+        self.rules = FraudRuleEngine()
+        self.localizer = PlateLocalizer()
+        self.ocr = BatchOCR(reader, cache=OCRCache())
+        self.trackers = {}
+        self.gates = {}
+        self.ledger = TollLedger(self.registry, db)
+        if db is not None:
+            self.ledger.start()
+        
+    def load_registry(self):
+        """Load registry from the database, seeding sample vehicles on first run"""
+        if self.db is None:
+            return VehicleRegistry.from_dataframe(self.create_sample_database())
+        
+        registry = VehicleRegistry.from_database(self.db)
+        if len(registry) == 0:
+            self.db.save_vehicles(self.create_sample_database().to_dict('records'))
+            registry.refresh_from_database(self.db, full=True)
+        
+        registry.start_auto_refresh(self.db)
+        return registry
+    
     def create_sample_database(self):
         """Create sample vehicle database"""
         vehicles = []
@@ -41,7 +86,7 @@ class SmartTagSystem:
             
             vehicles.append({
                 'plate_number': plate,
-                'owner': f"Owner_{i}",
+                'owner_name': f"Owner_{i}",
                 'vehicle_class': random.choice(self.vehicle_classes),
                 'balance': random.randint(100, 10000),
                 'blacklisted': random.random() < 0.05
@@ -49,9 +94,14 @@ class SmartTagSystem:
         
         return pd.DataFrame(vehicles)
     
-    def detect_vehicles(self, frame):
-        """Simple vehicle detection using color and contour detection"""
-        vehicles = []
+    def detect_vehicles(self, frame, mask=None, scale=1.0):
+        """Simple vehicle detection using color and contour detection
+        
+        frame may be a downscaled lane region; mask limits detection to the
+        lane polygon and scale converts areas back to full-frame pixels.
+        Vehicles are returned largest first.
+        """
+        candidates = []
         
         # Convert to grayscale
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
@@ -62,11 +112,15 @@ class SmartTagSystem:
         # Edge detection
         edges = cv2.Canny(blurred, 50, 150)
         
+        # Ignore edges outside the lane region
+        if mask is not None:
+            edges = cv2.bitwise_and(edges, mask)
+        
         # Find contours
         contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         
         for contour in contours:
-            area = cv2.contourArea(contour)
+            area = cv2.contourArea(contour) / (scale * scale)
             if area > 2000:  # Filter small contours
                 x, y, w, h = cv2.boundingRect(contour)
                 aspect_ratio = w / h
@@ -74,48 +128,131 @@ class SmartTagSystem:
                 # Filter by aspect ratio (vehicles are usually wider than tall)
                 if 1.0 < aspect_ratio < 3.0:
                     vehicle_class = random.choice(self.vehicle_classes)
-                    vehicles.append({
+                    candidates.append((area, {
                         'bbox': [x, y, x+w, y+h],
                         'class': vehicle_class,
                         'confidence': random.uniform(0.7, 0.98),
                         'center': [x + w//2, y + h//2]
-                    })
+                    }))
         
-        return vehicles[:5]  # Limit to 5 vehicles
+        # Largest contours first so a lane's vehicle cap keeps the real vehicles
+        candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+        return [vehicle for _, vehicle in candidates]
     
-    def read_plate(self, frame, bbox):
-        """Read license plate from vehicle region"""
+    def plate_region(self, frame, bbox):
+        """Crop the plate search region of a vehicle, returning (crop, bbox) or None"""
         x1, y1, x2, y2 = bbox
         
-        # Extract plate region (assume plate is in lower part of vehicle)
-        plate_roi = frame[y1 + (y2-y1)//2:y2, x1:x2]
+        # Prefer a localized plate so OCR only scans the plate itself
+        candidates = self.localizer.locate(frame, bbox)
+        if candidates:
+            x, y, w, h = candidates[0]
+            plate_roi = frame[y:y+h, x:x+w]
+            plate_bbox = [x, y, w, h]
+        else:
+            # Fall back to the lower part of the vehicle, where plates usually are
+            plate_roi = frame[y1 + (y2-y1)//2:y2, x1:x2]
+            plate_bbox = [x1, y1 + (y2-y1)//2, x2-x1, (y2-y1)//2]
         
         if plate_roi.size == 0:
             return None
         
-        # Use EasyOCR to read text
+        return plate_roi, plate_bbox
+    
+    def read_plates(self, frame, vehicles):
+        """Read license plates of all vehicles in one batched OCR call"""
+        regions = [self.plate_region(frame, vehicle['bbox']) for vehicle in vehicles]
+        
+        # Use EasyOCR to read every plate region at once
         try:
-            results = reader.readtext(plate_roi)
-            if results:
-                # Get the text with highest confidence
-                best_result = max(results, key=lambda x: x[2])
-                text = best_result[1]
-                confidence = best_result[2]
-                
-                # Clean text
-                text = re.sub(r'[^A-Za-z0-9]', '', text).upper()
-                
-                return {
-                    'text': text,
-                    'confidence': confidence,
-                    'bbox': [x1, y1 + (y2-y1)//2, x2-x1, (y2-y1)//2]
-                }
+            results = iter(self.ocr.read_best([region[0] for region in regions if region is not None]))
         except Exception as e:
             print(f"OCR Error: {e}")
+            return [None] * len(vehicles)
         
-        return None
+        plates = []
+        for region in regions:
+            # Get the text with highest confidence for this vehicle
+            best_result = next(results) if region is not None else None
+            if best_result is None:
+                plates.append(None)
+                continue
+            
+            text, confidence = best_result
+            
+            # Clean text and identify its plate format
+            text, plate_format = self.plate_formats.validate(text)
+            
+            plates.append({
+                'text': text,
+                'confidence': confidence,
+                'bbox': region[1],
+                'is_valid': plate_format is not None,
+                'plate_format': plate_format
+            })
+        
+        return plates
+    
+    def read_plate(self, frame, bbox):
+        """Read license plate from vehicle region"""
+        return self.read_plates(frame, [{'bbox': bbox}])[0]
+    
+    def view_for(self, lane_id):
+        """Configured camera view of one lane, or the full-frame default"""
+        return self.lane_views.get(lane_id, self.default_view)
+    
+    def check_lane(self, lane_id):
+        """Reject lane ids that are not configured, so clients cannot grow per-lane state"""
+        if lane_id not in self.lane_views and lane_id not in DEFAULT_LANES:
+            raise ValueError(f"Unknown lane: {lane_id}")
     
-    def check_fraud(self, vehicles, plates):
+    def tracker_for(self, lane_id):
+        """Tracker of one configured lane, created on first use"""
+        tracker = self.trackers.get(lane_id)
+        if tracker is None:
+            self.check_lane(lane_id)
+            tracker = self.trackers.setdefault(lane_id, VehicleTracker())
+        return tracker
+    
+    def analyze_frame(self, frame, lane_id=None):
+        """Detect, read and judge the vehicles in one frame, returning (vehicles, plates, fraud_results)"""
+        vehicles = self.view_for(lane_id).detect(frame, self.detect_vehicles)
+        tracker = self.tracker_for(lane_id)
+        tracks = tracker.update(vehicles)
+        
+        # OCR only tracks whose plate reading is still missing or weak
+        pending = [i for i, track in enumerate(tracks) if tracker.needs_ocr(track)]
+        for i, plate in zip(pending, self.read_plates(frame, [vehicles[i] for i in pending])):
+            tracks[i].observe_plate(plate)
+        plates = [track.plate_for(vehicle) for track, vehicle in zip(tracks, vehicles)]
+        
+        # Each track is judged, charged and recorded once, when its reading has settled
+        settled = [i for i, track in enumerate(tracks) if tracker.needs_verdict(track)]
+        judged = self.check_fraud([vehicles[i] for i in settled], [plates[i] for i in settled], lane_id)
+        for i, fraud_info in zip(settled, judged):
+            fraud_info['track_id'] = tracks[i].track_id
+            tracks[i].fraud_info = fraud_info
+        
+        # Vehicles that left before their reading settled are judged on their best one
+        departed = tracker.pop_departed()
+        if departed:
+            verdicts = self.check_fraud(
+                [track.vehicle for track in departed], [track.plate_for(track.vehicle) for track in departed], lane_id
+            )
+            for track, fraud_info in zip(departed, verdicts):
+                fraud_info['track_id'] = track.track_id
+            self.record_results(verdicts)
+        
+        # Other tracks show their verdict, or a placeholder while still being read
+        judged = dict(zip(settled, judged))
+        fraud_results = [
+            judged[i] if i in judged else track.result_for(vehicle)
+            for i, (track, vehicle) in enumerate(zip(tracks, vehicles))
+        ]
+        
+        return vehicles, plates, fraud_results
+    
+    def check_fraud(self, vehicles, plates, lane_id=None):
         """Check for fraudulent activities"""
         fraud_results = []
         
@@ -127,42 +264,159 @@ class SmartTagSystem:
                 'is_fraud': False,
                 'fraud_type': None,
                 'confidence': 0,
-                'timestamp': datetime.now().isoformat()
+                'timestamp': datetime.now().isoformat(),
+                'is_repeat': False,
+                'fraud_flags': [],
+                'plate_number': None
             }
             
             # Check if plate was detected
             plate_text = None
             if i < len(plates) and plates[i]:
                 plate_text = plates[i]['text']
+                fraud_info['plate_number'] = plate_text
                 
                 # Check if vehicle is registered
-                registered = plate_text in self.registered_vehicles['plate_number'].values
+                record = self.registry.lookup(plate_text)
+                
+                # Same lane within the window is a waiting vehicle, another lane is a cloned tag
+                sighting = None
+                if lane_id is not None:
+                    sighting = self.sightings.observe(plate_text, lane_id)
+                    fraud_info['is_repeat'] = sighting == SightingWindow.REPEAT
                 
-                if not registered:
+                # Evaluate every fraud rule against the one fetched record
+                fired = self.rules.evaluate_record(
+                    plate_found=True,
+                    has_text=bool(plate_text),
+                    plate_valid=plates[i].get('is_valid', True),
+                    registered=record is not None,
+                    blacklisted=record is not None and bool(record.blacklisted),
+                    balance=self.ledger.balance(plate_text) if record is not None else np.nan,
+                    toll=self.ledger.toll_for(record.vehicle_class) if record is not None else np.nan,
+                    registered_class=record.vehicle_class if record is not None else None,
+                    detected_class=vehicle['class'],
+                    duplicate=sighting == SightingWindow.DUPLICATE,
+                    match_score=1.0
+                )
+                fraud_info['fraud_flags'] = [rule.name for rule in fired]
+                
+                # Highest-priority rule decides the reported fraud type
+                if fired:
                     fraud_info['is_fraud'] = True
-                    fraud_info['fraud_type'] = self.fraud_types['UNREGISTERED']
-                    fraud_info['confidence'] = 0.95
-                else:
-                    # Check class mismatch
-                    vehicle_data = self.registered_vehicles[
-                        self.registered_vehicles['plate_number'] == plate_text
-                    ].iloc[0]
-                    
-                    if vehicle_data['vehicle_class'] != vehicle['class']:
-                        fraud_info['is_fraud'] = True
-                        fraud_info['fraud_type'] = self.fraud_types['CLASS_MISMATCH']
-                        fraud_info['confidence'] = 0.9
-                    
-                    # Check blacklist
-                    if vehicle_data['blacklisted']:
+                    fraud_info['fraud_type'] = fired[0].fraud_type
+                    fraud_info['confidence'] = fired[0].confidence
+                
+                if record is not None and sighting == SightingWindow.NEW and not fraud_info['is_fraud']:
+                    fraud_info['toll'] = self.ledger.debit(plate_text, vehicle['class'], {
+                        'timestamp': fraud_info['timestamp'],
+                        'confidence': vehicle['confidence']
+                    })
+                    if not fraud_info['toll']['charged']:
                         fraud_info['is_fraud'] = True
-                        fraud_info['fraud_type'] = 'Blacklisted Vehicle'
+                        fraud_info['fraud_type'] = 'Insufficient Balance'
+                        fraud_info['fraud_flags'].append('LOW_BALANCE')
                         fraud_info['confidence'] = 1.0
             
             fraud_results.append(fraud_info)
         
         return fraud_results
     
+    def verify_vehicle(self, plate_number, vehicle_class):
+        """Check a plate against the same fraud rules as live frames, including the balance rule"""
+        vehicle = self.registry.lookup(plate_number)
+        balance = self.ledger.balance(plate_number) if vehicle is not None else None
+        
+        fired = self.rules.evaluate_record(
+            plate_found=True,
+            has_text=True,
+            plate_valid=True,
+            registered=vehicle is not None,
+            blacklisted=vehicle is not None and bool(vehicle.blacklisted),
+            balance=balance if balance is not None else np.nan,
+            toll=self.ledger.toll_for(vehicle.vehicle_class) if vehicle is not None else np.nan,
+            registered_class=vehicle.vehicle_class if vehicle is not None else None,
+            detected_class=vehicle_class,
+            match_score=1.0
+        )
+        
+        # Report the highest-priority failure, but keep every rule that fired
+        messages = {
+            'UNREGISTERED': "Vehicle not registered",
+            'BLACKLISTED': "Vehicle is blacklisted",
+            'LOW_BALANCE': f"Insufficient balance: ₹{balance}",
+            'CLASS_MISMATCH': f"Class mismatch. Registered as {vehicle.vehicle_class if vehicle is not None else None}"
+        }
+        failures = [rule.name for rule in fired if rule.name in messages]
+        
+        if failures:
+            return {
+                "verified": False,
+                "message": messages[failures[0]],
+                "status": failures[0],
+                "fraud_flags": failures
+            }
+        
+        return {
+            "verified": True,
+            "message": "Vehicle verified successfully",
+            "status": "VERIFIED",
+            "owner": vehicle.owner_name,
+            "balance": balance
+        }
+    
+    def record_results(self, fraud_results):
+        """Persist first sightings as transactions and log the frauds among them"""
+        if self.db is None:
+            return
+        
+        for fraud_info in fraud_results:
+            # Charged passages were already written by the ledger
+            if fraud_info['is_repeat'] or fraud_info.get('toll', {}).get('charged'):
+                continue
+            
+            # Without a plate only a track's one verdict tells a new vehicle from the last frame's
+            if fraud_info['plate_number'] is None and fraud_info.get('track_id') is None:
+                continue
+            
+            self.db.save_transaction(fraud_info)
+            if fraud_info['is_fraud']:
+                self.db.log_fraud(fraud_info['plate_number'], fraud_info['fraud_type'], fraud_info['confidence'])
+    
+    def gate_for(self, lane_id):
+        """Motion gate of one configured lane, created on first use"""
+        gate = self.gates.get(lane_id)
+        if gate is None:
+            self.check_lane(lane_id)
+            gate = self.gates.setdefault(lane_id, MotionGate())
+        return gate
+    
+    def render_frame(self, frame, lane_id=None):
+        """Run the full pipeline on a frame and build the annotated response payload"""
+        vehicles, plates, fraud_results = self.analyze_frame(frame, lane_id)
+        self.record_results(fraud_results)
+        annotated_frame = self.annotate_frame(frame, vehicles, plates, fraud_results)
+        
+        _, buffer = cv2.imencode('.jpg', annotated_frame)
+        annotated_image = base64.b64encode(buffer).decode('utf-8')
+        
+        return {
+            'annotated_image': f"data:image/jpeg;base64,{annotated_image}",
+            'vehicles': vehicles,
+            'plates': [p for p in plates if p],
+            'fraud_results': fraud_results,
+            'stats': {
+                'vehicle_count': len(vehicles),
+                'plate_count': len([p for p in plates if p]),
+                'fraud_count': len([f for f in fraud_results if f['is_fraud']])
+            }
+        }
+    
+    def process_lane_frame(self, frame, lane_id=None):
+        """Render a frame, or reuse the lane's previous payload if nothing moved"""
+        result, processed = self.gate_for(lane_id).process(frame, lambda frame: self.render_frame(frame, lane_id))
+        return dict(result, motion_skipped=not processed, timestamp=datetime.now().isoformat())
+    
     def annotate_frame(self, frame, vehicles, plates, fraud_results):
         """Annotate frame with detections"""
         annotated = frame.copy()
@@ -204,16 +458,38 @@ class SmartTagSystem:
         return annotated
 
 # Initialize system
-system = SmartTagSystem()
+# With SMARTTAG_ARCHIVE_DIR set, rows older than SMARTTAG_RETENTION_DAYS move to Parquet there
+db = DatabaseManager(archive_dir=os.environ.get('SMARTTAG_ARCHIVE_DIR'))
+if db.archive is not None:
+    db.start_retention(int(os.environ.get('SMARTTAG_RETENTION_DAYS', 90)))
+system = SmartTagSystem(db, load_lane_views(os.environ.get('SMARTTAG_LANES', 'lanes.json')))
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    return jsonify({"status": "healthy", "timestamp": datetime.now().isoformat()})
+    return jsonify({
+        "status": "healthy",
+        "timestamp": datetime.now().isoformat(),
+        "ocr": system.ocr.get_stats(),
+        "plate_localizer": system.localizer.get_stats(),
+        "writes": system.db.get_write_stats(),
+        "rules": system.rules.rule_stats(),
+        "tracking": {str(lane_id): tracker.get_stats() for lane_id, tracker in system.trackers.items()},
+        "motion": {str(lane_id): gate.get_stats() for lane_id, gate in system.gates.items()}
+    })
 
 @app.route('/api/process_frame', methods=['POST'])
 def process_frame():
     try:
         data = request.json
+        
+        # Frames without a lane id share one, so tracking and sighting dedup
+        # still apply; any other lane must be configured
+        lane_id = data.get('lane_id', 'http')
+        try:
+            system.check_lane(lane_id)
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+        
         image_data = data['image'].split(',')[1]
         image_bytes = base64.b64decode(image_data)
         
@@ -221,87 +497,81 @@ def process_frame():
         nparr = np.frombuffer(image_bytes, np.uint8)
         frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
         
-        # Detect vehicles
-        vehicles = system.detect_vehicles(frame)
+        # Skip detection, OCR and re-encoding when the lane did not change
+        result = system.process_lane_frame(frame, lane_id)
         
-        # Read plates
-        plates = []
-        for vehicle in vehicles:
-            plate = system.read_plate(frame, vehicle['bbox'])
-            plates.append(plate)
-        
-        # Check fraud
-        fraud_results = system.check_fraud(vehicles, plates)
+        return jsonify(dict(result, success=True))
         
-        # Annotate frame
-        annotated_frame = system.annotate_frame(frame, vehicles, plates, fraud_results)
-        
-        # Convert back to base64
-        _, buffer = cv2.imencode('.jpg', annotated_frame)
-        annotated_image = base64.b64encode(buffer).decode('utf-8')
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/api/get_statistics', methods=['GET'])
+def get_statistics():
+    try:
+        # Served from the hourly rollups, not a scan of every transaction
+        statistics = system.db.get_rollup_statistics(request.args.get('start'), request.args.get('end'))
+        return jsonify({"success": True, "statistics": statistics})
         
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+def transaction_filters(args):
+    """Read the shared transaction filters from query parameters"""
+    return {
+        'plate_number': args.get('plate'),
+        'fraud_type': args.get('fraud_type'),
+        'start': args.get('start'),
+        'end': args.get('end')
+    }
+
+@app.route('/api/transactions', methods=['GET'])
+def get_transactions():
+    try:
+        # The cursor is the (timestamp, id) of the last row on the previous page
+        after = None
+        if request.args.get('cursor'):
+            timestamp, transaction_id = request.args['cursor'].rsplit('|', 1)
+            after = (timestamp, int(transaction_id))
+        
+        transactions, next_cursor = system.db.get_transactions_page(
+            limit=max(1, min(int(request.args.get('limit', 100)), 1000)),
+            after=after,
+            **transaction_filters(request.args)
+        )
         return jsonify({
             "success": True,
-            "annotated_image": f"data:image/jpeg;base64,{annotated_image}",
-            "vehicles": vehicles,
-            "plates": [p for p in plates if p],
-            "fraud_results": fraud_results,
-            "stats": {
-                "vehicle_count": len(vehicles),
-                "plate_count": len([p for p in plates if p]),
-                "fraud_count": len([f for f in fraud_results if f['is_fraud']])
-            },
-            "timestamp": datetime.now().isoformat()
+            "transactions": transactions,
+            "next_cursor": f"{next_cursor[0]}|{next_cursor[1]}" if next_cursor else None
         })
         
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
+@app.route('/api/transactions/export', methods=['GET'])
+def export_transactions():
+    # One JSON object per line, fetched page by page so memory stays flat
+    filters = transaction_filters(request.args)
+    
+    # archive=1 continues into transactions rolled out by retention
+    include_archive = request.args.get('archive') == '1'
+    if include_archive and system.db.archive is None:
+        return jsonify({"success": False, "error": "Archive is not configured (set SMARTTAG_ARCHIVE_DIR)"}), 400
+    
+    rows = system.db.iter_transactions(include_archive=include_archive, **filters)
+    return Response(
+        (json.dumps(row, default=str) + '\n' for row in rows),
+        mimetype='application/x-ndjson',
+        headers={'Content-Disposition': 'attachment; filename=transactions.ndjson'}
+    )
+
 @app.route('/api/verify_vehicle', methods=['POST'])
 def verify_vehicle():
     data = request.json
     plate_number = data.get('plate_number', '').upper()
     vehicle_class = data.get('vehicle_class', '')
     
-    # Check if vehicle exists
-    vehicle_data = system.registered_vehicles[
-        system.registered_vehicles['plate_number'] == plate_number
-    ]
-    
-    if len(vehicle_data) == 0:
-        return jsonify({
-            "success": True,
-            "verified": False,
-            "message": "Vehicle not registered",
-            "status": "UNREGISTERED"
-        })
-    
-    vehicle = vehicle_data.iloc[0]
-    
-    if vehicle['blacklisted']:
-        return jsonify({
-            "success": True,
-            "verified": False,
-            "message": "Vehicle is blacklisted",
-            "status": "BLACKLISTED"
-        })
-    
-    if vehicle['vehicle_class'] != vehicle_class:
-        return jsonify({
-            "success": True,
-            "verified": False,
-            "message": f"Class mismatch. Registered as {vehicle['vehicle_class']}",
-            "status": "CLASS_MISMATCH"
-        })
-    
-    return jsonify({
-        "success": True,
-        "verified": True,
-        "message": "Vehicle verified successfully",
-        "status": "VERIFIED",
-        "owner": vehicle['owner'],
-        "balance": vehicle['balance']
-    })
+    # Same rules as live frames, so blacklist, balance and class checks agree
+    return jsonify(dict(system.verify_vehicle(plate_number, vehicle_class), success=True))
 
 @socketio.on('connect')
 def handle_connect():
@@ -321,36 +591,13 @@ def handle_stream_frame(data):
         nparr = np.frombuffer(image_bytes, np.uint8)
         frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
         
-        # Process frame
-        vehicles = system.detect_vehicles(frame)
-        plates = []
-        for vehicle in vehicles:
-            plate = system.read_plate(frame, vehicle['bbox'])
-            plates.append(plate)
-        
-        fraud_results = system.check_fraud(vehicles, plates)
-        annotated_frame = system.annotate_frame(frame, vehicles, plates, fraud_results)
-        
-        _, buffer = cv2.imencode('.jpg', annotated_frame)
-        annotated_image = base64.b64encode(buffer).decode('utf-8')
-        
-        emit('processed_frame', {
-            'annotated_image': f"data:image/jpeg;base64,{annotated_image}",
-            'vehicles': vehicles,
-            'plates': [p for p in plates if p],
-            'fraud_results': fraud_results,
-            'stats': {
-                'vehicle_count': len(vehicles),
-                'plate_count': len([p for p in plates if p]),
-                'fraud_count': len([f for f in fraud_results if f['is_fraud']])
-            },
-            'timestamp': datetime.now().isoformat()
-        })
+        # Process frame, or resend the previous result if nothing moved
+        emit('processed_frame', system.process_lane_frame(frame, data.get('lane_id', 'default')))
         
     except Exception as e:
         print(f"Error processing frame: {e}")
 
 if __name__ == '__main__':
     print("SmartTag System Starting...")
-    print(f"Registered vehicles: {len(system.registered_vehicles)}")
+    print(f"Registered vehicles: {len(system.registry)}")
     socketio.run(app, debug=True, port=5000)
\ No newline at end of file